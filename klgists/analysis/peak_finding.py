@@ -4,6 +4,8 @@ Functions for identifying peaks in signals.
 from __future__ import division, print_function, absolute_import
 
 import math
+import itertools
+import functools
 import numpy as np
 
 from scipy._lib.six import xrange
@@ -12,6 +14,13 @@ from scipy.stats import scoreatpercentile
 
 from scipy.signal._peak_finding_utils import (_peak_prominences)
 
+# np.take edge modes and the np.pad modes that reproduce them
+_take_to_pad_modes = {'clip': 'edge', 'wrap': 'wrap'}
+# Window elements per np.percentile call when calculating the noise floor
+_noise_floor_block_elements = 1 << 22
+# Transforms kept by find_peaks_cwt(..., cache=True); each holds a len(widths) x len(vector) matrix
+_cwt_cache_size = 4
+
 
 class PeakFinder:
 
@@ -61,15 +70,26 @@ class PeakFinder:
             raise ValueError('Order must be an int >= 1')
 
         datalen = data.shape[axis]
-        locs = np.arange(0, datalen)
-
         results = np.ones(data.shape, dtype=bool)
-        main = data.take(locs, axis=axis, mode=mode)
+        main = data
+        if mode in _take_to_pad_modes:
+            # Pad once and compare against shifted views,
+            # rather than materializing two copies with take() for every shift
+            padded = np.pad(data, [(order, order) if ax == axis else (0, 0) for ax in xrange(data.ndim)],
+                            mode=_take_to_pad_modes[mode])
+            index = [slice(None)] * data.ndim
+
+            def shifted(shift):
+                index[axis] = slice(order + shift, order + shift + datalen)
+                return padded[tuple(index)]
+        else:
+            locs = np.arange(0, datalen)
+
+            def shifted(shift):
+                return data.take(locs + shift, axis=axis, mode=mode)
+
         for shift in xrange(1, order + 1):
-            plus = data.take(locs + shift, axis=axis, mode=mode)
-            minus = data.take(locs - shift, axis=axis, mode=mode)
-            results &= comparator(main, plus)
-            results &= comparator(main, minus)
+            results &= comparator(main, shifted(shift)) & comparator(main, shifted(-shift))
             if~results.any():
                 return results
         return results
@@ -287,21 +307,24 @@ class PeakFinder:
                              'as matr')
 
         all_max_cols = PeakFinder._boolrelextrema(matr, np.greater, axis=1, order=1)
-        # Highest row for which there are any relative maxima
-        has_relmax = np.where(all_max_cols.any(axis=1))[0]
-        if len(has_relmax) == 0:
+        # Column indices of the relative maxima, grouped by row, from one pass over the boolean matrix
+        # np.nonzero is row-major, so rows are sorted and columns are ascending within each row
+        max_rows, max_cols = np.nonzero(all_max_cols)
+        if len(max_rows) == 0:
             return []
-        start_row = has_relmax[-1]
+        row_bounds = np.searchsorted(max_rows, np.arange(1, matr.shape[0]))
+        max_cols_by_row = np.split(max_cols, row_bounds)
+        # Highest row for which there are any relative maxima
+        start_row = max_rows[-1]
         # Each ridge line is a 3-tuple:
         # rows, cols,Gap number
         ridge_lines = [[[start_row],
                        [col],
-                       0] for col in np.where(all_max_cols[start_row])[0]]
+                       0] for col in max_cols_by_row[start_row]]
         final_lines = []
         rows = np.arange(start_row - 1, -1, -1)
-        cols = np.arange(0, matr.shape[1])
         for row in rows:
-            this_max_cols = cols[all_max_cols[row]]
+            this_max_cols = max_cols_by_row[row]
 
             # Increment gap number of each line,
             # set it to zero later if appropriate
@@ -312,18 +335,19 @@ class PeakFinder:
             # But the order might be different. Might be an efficiency gain
             # to make sure the order is the same and avoid this iteration
             prev_ridge_cols = np.array([line[1][-1] for line in ridge_lines])
-            # Look through every relative maximum found at current row
+            # Find the closest previous ridge line for every relative maximum
+            # at current row at once, rather than scanning all of them per maximum
+            if len(prev_ridge_cols) > 0 and len(this_max_cols) > 0:
+                closest, diffs = PeakFinder._closest_ridges(this_max_cols, prev_ridge_cols)
+                connected = diffs <= max_distances[row]
+            else:
+                closest = connected = np.zeros(len(this_max_cols), dtype=bool)
             # Attempt to connect them with existing ridge lines.
-            for ind, col in enumerate(this_max_cols):
+            for col, line_index, connect in zip(this_max_cols, closest, connected):
                 # If there is a previous ridge line within
                 # the max_distance to connect to, do so.
                 # Otherwise start a new one.
-                line = None
-                if len(prev_ridge_cols) > 0:
-                    diffs = np.abs(col - prev_ridge_cols)
-                    closest = np.argmin(diffs)
-                    if diffs[closest] <= max_distances[row]:
-                        line = ridge_lines[closest]
+                line = ridge_lines[line_index] if connect else None
                 if line is not None:
                     # Found a point close enough, extend current ridge line
                     line[1].append(col)
@@ -355,9 +379,82 @@ class PeakFinder:
 
         return out_lines
 
+    @staticmethod
+    def _closest_ridges(cols, ridge_cols):
+        """
+        Find the closest ridge line to each column.
+
+        Equivalent to ``np.argmin(np.abs(col - ridge_cols))`` for each column,
+        including picking the lowest index on ties, but in O(n log n) overall.
+
+        Parameters
+        ----------
+        cols : 1-D ndarray
+            Columns to match.
+        ridge_cols : 1-D ndarray
+            The last column of each ridge line; must not be empty.
+
+        Returns
+        -------
+        closest : ndarray
+            Index into `ridge_cols` of the closest ridge line to each column.
+        diffs : ndarray
+            Distance from each column to that ridge line.
+
+        """
+        order = np.argsort(ridge_cols, kind='stable')
+        ordered = ridge_cols[order]
+        # The sort is stable, so the first of a run of equal values has the lowest index
+        # First ridge at or right of each column
+        right = np.searchsorted(ordered, cols, side='left')
+        has_left, has_right = right > 0, right < len(ordered)
+        # First of the run of ridges immediately left of each column
+        left = np.searchsorted(ordered, ordered[np.maximum(right - 1, 0)], side='left')
+        right = np.minimum(right, len(ordered) - 1)
+        right_diffs = np.where(has_right, ordered[right] - cols, np.inf)
+        left_diffs = np.where(has_left, cols - ordered[left], np.inf)
+        right_index, left_index = order[right], order[left]
+        take_left = (left_diffs < right_diffs) | ((left_diffs == right_diffs) & (left_index < right_index))
+        return np.where(take_left, left_index, right_index), np.minimum(left_diffs, right_diffs)
+
+    @staticmethod
+    def _noise_floor(row_one, window_size, noise_perc):
+        """
+        Calculate the `noise_perc`th percentile of `row_one` in a window of
+        `window_size` around each point, truncating the window at the edges.
+
+        Full windows are computed together with `np.percentile` over a strided
+        view of the windows, a block at a time to bound memory; only the truncated
+        windows at the edges go through `scoreatpercentile` one at a time.
+
+        """
+        num_points = len(row_one)
+        hf_window, odd = divmod(window_size, 2)
+        noises = np.zeros_like(row_one)
+        # Points whose window fits entirely inside row_one
+        first_full, n_full = hf_window, num_points - window_size + 1
+        if window_size < 1 or n_full < 1:
+            first_full, n_full = 0, 0
+        else:
+            # Equivalent to sliding_window_view, which needs numpy 1.20
+            windows = np.lib.stride_tricks.as_strided(row_one, shape=(n_full, window_size),
+                                                      strides=(row_one.strides[0], row_one.strides[0]),
+                                                      writeable=False)
+            block = max(1, _noise_floor_block_elements // window_size)
+            for start in xrange(0, n_full, block):
+                stop = min(start + block, n_full)
+                noises[first_full + start:first_full + stop] = np.percentile(windows[start:stop],
+                                                                             noise_perc, axis=1)
+        for ind in itertools.chain(xrange(0, first_full), xrange(first_full + n_full, num_points)):
+            window_start = max(ind - hf_window, 0)
+            window_end = min(ind + hf_window + odd, num_points)
+            noises[ind] = scoreatpercentile(row_one[window_start:window_end],
+                                            per=noise_perc)
+        return noises
+
     @staticmethod
     def _filter_ridge_lines(cwt, ridge_lines, window_size=None, min_length=None,
-                            min_snr=1, noise_perc=10):
+                            min_snr=1, noise_perc=10, noises=None):
         """
         Filter ridge lines according to prescribed criteria. Intended
         to be used for finding relative maxima.
@@ -384,6 +481,9 @@ class PeakFinder:
             When calculating the noise floor, percentile of data points
             examined below which to consider noise. Calculated using
             scipy.stats.scoreatpercentile.
+        noises : 1-D ndarray, optional
+            A precomputed noise floor for ``cwt[0]``, from `_noise_floor` with the
+            same `window_size` and `noise_perc`. Calculated if not given.
 
         References
         ----------
@@ -398,30 +498,25 @@ class PeakFinder:
             window_size = np.ceil(num_points / 20)
 
         window_size = int(window_size)
-        hf_window, odd = divmod(window_size, 2)
 
         # Filter based on SNR
-        row_one = cwt[0, :]
-        noises = np.zeros_like(row_one)
-        for ind, val in enumerate(row_one):
-            window_start = max(ind - hf_window, 0)
-            window_end = min(ind + hf_window + odd, num_points)
-            noises[ind] = scoreatpercentile(row_one[window_start:window_end],
-                                            per=noise_perc)
-
-        def filt_func(line):
-            if len(line[0]) < min_length:
-                return False
-            snr = abs(cwt[line[0][0], line[1][0]] / noises[line[1][0]])
-            if snr < min_snr:
-                return False
-            return True
-
-        return list(filter(filt_func, ridge_lines))
+        if noises is None:
+            noises = PeakFinder._noise_floor(cwt[0, :], window_size, noise_perc)
+
+        # Gather the first point and length of every ridge line, then filter them all at once
+        n_lines = len(ridge_lines)
+        rows0 = np.fromiter((line[0][0] for line in ridge_lines), dtype=np.intp, count=n_lines)
+        cols0 = np.fromiter((line[1][0] for line in ridge_lines), dtype=np.intp, count=n_lines)
+        lengths = np.fromiter((len(line[0]) for line in ridge_lines), dtype=np.intp, count=n_lines)
+        snr = np.abs(cwt[rows0, cols0] / noises[cols0])
+        # Written as "not below" so that a NaN SNR passes, as it always has
+        keep = (lengths >= min_length) & ~(snr < min_snr)
+        return [ridge_lines[ind] for ind in np.flatnonzero(keep)]
 
     @staticmethod
     def find_peaks_cwt(vector, widths, wavelet=None, max_distances=None,
-                       gap_thresh=None, min_length=None, min_snr=1, noise_perc=10, noise_window_size=None):
+                       gap_thresh=None, min_length=None, min_snr=1, noise_perc=10, noise_window_size=None,
+                       cache=False):
         """
         Find peaks in a 1-D array with wavelet transformation.
 
@@ -464,6 +559,11 @@ class PeakFinder:
             When calculating the noise floor, percentile of data points
             examined below which to consider noise. Calculated using
             `stats.scoreatpercentile`.  Default is 10.
+        cache : bool, optional
+            Keep the CWT matrix and noise floor of the last few vectors, so that
+            parameter sweeps over the same vector skip recalculating them.
+            Each cached entry holds a full ``len(widths) x len(vector)`` matrix;
+            release them with `PeakFinder.cache_clear`. Default False.
 
         Returns
         -------
@@ -521,15 +621,46 @@ class PeakFinder:
         if noise_window_size is None:
             noise_window_size = np.ceil(len(vector) / 20)
 
-        cwt_dat = cwt(vector, wavelet, widths)
+        if cache:
+            vector = np.ascontiguousarray(vector)
+            key = (vector.tobytes(), vector.dtype.str, vector.shape, tuple(widths.tolist()), wavelet)
+            cwt_dat = _cached_cwt(*key)
+            noises = _cached_noise_floor(*key, int(noise_window_size), noise_perc)
+        else:
+            cwt_dat = cwt(vector, wavelet, widths)
+            noises = None
         ridge_lines = PeakFinder._identify_ridge_lines(cwt_dat, max_distances, gap_thresh)
         filtered = PeakFinder._filter_ridge_lines(cwt_dat, ridge_lines, min_length=min_length,
-                                       min_snr=min_snr, noise_perc=noise_perc, window_size=noise_window_size)
+                                       min_snr=min_snr, noise_perc=noise_perc, window_size=noise_window_size,
+                                       noises=noises)
         max_locs = np.asarray([x[1][0] for x in filtered])
         max_locs.sort()
 
         return max_locs
 
+    @staticmethod
+    def cache_clear():
+        """Releases the matrices kept by ``find_peaks_cwt(..., cache=True)``."""
+        _cached_cwt.cache_clear()
+        _cached_noise_floor.cache_clear()
+
+
+@functools.lru_cache(maxsize=_cwt_cache_size)
+def _cached_cwt(vector_bytes, dtype, shape, widths, wavelet):
+    vector = np.frombuffer(vector_bytes, dtype=dtype).reshape(shape)
+    cwt_dat = cwt(vector, wavelet, np.asarray(widths))
+    # shared between calls, so make sure nobody modifies it
+    cwt_dat.flags.writeable = False
+    return cwt_dat
+
+
+@functools.lru_cache(maxsize=_cwt_cache_size)
+def _cached_noise_floor(vector_bytes, dtype, shape, widths, wavelet, window_size, noise_perc):
+    cwt_dat = _cached_cwt(vector_bytes, dtype, shape, widths, wavelet)
+    noises = PeakFinder._noise_floor(cwt_dat[0, :], window_size, noise_perc)
+    noises.flags.writeable = False
+    return noises
+
 
 __all__ = ['PeakFinder']
 
@@ -1,12 +1,24 @@
 import os
 import json
+import pickle
 import requests
 import re
+import tempfile
 from datetime import datetime
-from typing import Iterator, Set
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Iterator, Iterable, ValuesView
+try:
+	import ijson
+except ImportError:
+	ijson = None
 pjoin = os.path.join
 pexists = os.path.exists
 
+# ex: <b>A01AA01</b> - sodium fluoride
+_atc_line_pattern = re.compile(r'^(?:<[^>]+>)? *([^ ]+) +- +(?:<[^>]+>)? *([^<]+).*$')
+
 
 class Atc:
 	def __init__(self, code: str, desc: str, parent):
@@ -14,7 +26,8 @@ class Atc:
 		self.desc = desc
 		self.parent = parent
 		self.level = len(code) if self.code != '/' else 0
-		self.children = set()
+		self.children = []
+		self._ancestry = None
 	
 	def __eq__(self, o):
 		return isinstance(o, Atc) and self.code == o.code
@@ -53,12 +66,13 @@ class Atc:
 		raise ValueError("Inconsistent leaf definition for {}".format(self))
 	
 	def ancestry(self) -> list:
-		parents = []
-		if self.parent is not None:
-			for a in self.parent.ancestry():
-				parents.append(a)
-		parents.append(self)
-		return parents
+		return list(self._ancestry_tuple())
+
+	def _ancestry_tuple(self) -> tuple:
+		# parents never change after construction, so each node builds its chain once from its parent's
+		if self._ancestry is None:
+			self._ancestry = (() if self.parent is None else self.parent._ancestry_tuple()) + (self,)
+		return self._ancestry
 	
 	def descendents(self):
 		return {b for b in self.bfs() if b != self}
@@ -67,16 +81,23 @@ class Atc:
 		return AtcTree(self, {n.code: n for n in self.bfs()})
 	
 	def dfs(self):
-		for node in self.children:
-			yield from node.dfs()
-			yield node
-		yield self
+		"""Depth-first, post-order: each node comes after its descendents."""
+		stack = [(self, False)]
+		while stack:
+			node, expanded = stack.pop()
+			if expanded:
+				yield node
+			else:
+				stack.append((node, True))
+				stack.extend((child, False) for child in reversed(list(node.children)))
 	
 	def bfs(self):
-		yield self
-		for node in self.children:
+		"""Breadth-first: level by level, starting with this node."""
+		queue = deque([self])
+		while queue:
+			node = queue.popleft()
 			yield node
-			yield from node.dfs()
+			queue.extend(node.children)
 	
 	def leaves(self):
 		for node in self.bfs():
@@ -93,11 +114,17 @@ class AtcTree:
 		self.root = root
 		self._lookup = lookup
 	
-	def get(self) -> Atc:
-		return self._lookup[Atc]
+	def get(self, code: str) -> Atc:
+		return self._lookup[code]
+	
+	def __getitem__(self, code: str) -> Atc:
+		return self._lookup[code]
+	
+	def __contains__(self, code: str) -> bool:
+		return code in self._lookup
 		
-	def nodes(self) -> Set[Atc]:
-		return set(self._lookup.values())
+	def nodes(self) -> ValuesView[Atc]:
+		return self._lookup.values()
 	
 	def dfs(self) -> Iterator[Atc]:
 		yield from self.root.dfs()
@@ -109,7 +136,7 @@ class AtcTree:
 		yield from self.root.leaves()
 	
 	def __len__(self):
-		return len(self.nodes())
+		return len(self._lookup)
 	
 	def __repr__(self):
 		return "AtcTree({} nodes @ {})".format(len(self._lookup), hex(id(self)))
@@ -122,69 +149,145 @@ class AtcParser:
 	
 	URL = 'https://pubchem.ncbi.nlm.nih.gov/rest/pug_view/annotations/heading/JSON/?source=WHO%20ATC&heading=ATC+Code&response_type=save&response_basename=PubChemAnnotations_source=WHO%20ATC&heading=ATC+Code&page={page}'
 
-	def __init__(self):
+	def __init__(self, n_download_workers: int = 8):
 		self.cache_dir = '.atc'
+		self.n_download_workers = n_download_workers
+		# one session so that pages reuse a kept-alive connection
+		self._session = requests.Session()
 		if not pexists(self.cache_dir):
 			os.makedirs(self.cache_dir)
 	
 	def load(self, force_download: bool = False):
 		atcs = {'/': Atc.root()}
-		if not force_download and pexists(pjoin(self.cache_dir, 'is-done')):
+		tree_path = pjoin(self.cache_dir, 'tree.pkl')
+		if not force_download and pexists(tree_path):
+			print("Loading from cache...")
+			self._load_tree(tree_path, atcs)
+		elif not force_download and pexists(pjoin(self.cache_dir, 'is-done')):
 			print("Loading from cache...")
 			self._load_from_cache(atcs)
 		else:
 			print("Loading from URL...")
-			self._download(atcs)
+			self._download(atcs, force_download)
 		print("Loaded {} ATC codes".format(len(atcs)))
 		for atc in atcs.values():
-			atc.children = sorted(list(atc.children))
+			atc.children.sort(key=lambda a: a.code)
+		if force_download or not pexists(tree_path):
+			self._save_tree(tree_path, atcs['/'])
 		return AtcTree(atcs['/'], atcs)
 	
+	def _save_tree(self, path: str, root: Atc) -> None:
+		"""Pickles the parsed tree as (code, desc, parent code) tuples, parents first, so that it loads in one pass."""
+		nodes = [(atc.code, atc.desc, atc.parent.code) for atc in root.bfs() if not atc.is_root()]
+		# write then rename so an interrupted write never leaves a truncated tree behind
+		with open(path + '.tmp', 'wb') as f:
+			pickle.dump(nodes, f, protocol=pickle.HIGHEST_PROTOCOL)
+		os.replace(path + '.tmp', path)
+	
+	def _load_tree(self, path: str, atcs: dict) -> None:
+		with open(path, 'rb') as f:
+			nodes = pickle.load(f)
+		for code, desc, parent_code in nodes:
+			parent = atcs[parent_code]
+			child = Atc(code, desc, parent)
+			parent.children.append(child)
+			atcs[code] = child
+	
 	def _load_from_cache(self, atcs: dict):
 		i = 1
 		while True:
-			p = pjoin(self.cache_dir, 'page-{}.txt'.format(i))
+			p = self._page_path(i)
 			if not pexists(p): break
-			with open(p) as f:
-				data = json.loads(f.read())['Annotations']['Annotation']
-				for atc in self._parse(data, atcs):
-					pass
+			self._parse_page(p, atcs)
 			i += 1
 	
-	def _download(self, atcs: dict):
-		response = requests.get(AtcParser.URL.format(page=1))
-		data = response.json()['Annotations']
-		n_pages = data['TotalPages']
-		for i in range(1, n_pages+1):  # downloading page 1 twice, but whatever
-			response = requests.get(AtcParser.URL.format(page=i))
-			print("Downloading page {} of {}.".format(i, n_pages))
-			with open(pjoin(self.cache_dir, 'page-{}.txt'.format(i)), 'w') as f:
-				f.write(response.text)
-			data = response.json()['Annotations']
-			for atc in self._parse(data['Annotation'], atcs):
-					pass
-			with open(pjoin(self.cache_dir, 'is_done'), 'w') as f:
-				f.write(str(datetime.now()))
-	
-	def _parse(self, items: list, atcs: dict):
-		pat = re.compile("""^(?:<[^>]+>)? *([^ ]+) +\- +(?:<[^>]+>)? *([^<]+).*$""")
+	def _download(self, atcs: dict, force: bool = False):
+		# page 1 tells us how many pages there are, so fetch and parse it first
+		p = self._fetch_page(1, force)
+		n_pages = self._total_pages(p)
+		print("Fetched page 1 of {}.".format(n_pages))
+		self._parse_page(p, atcs)
+		# fetch the rest concurrently, but parse on this thread so atcs needs no locking
+		with ThreadPoolExecutor(max_workers=self.n_download_workers) as executor:
+			for i, p in zip(range(2, n_pages+1), executor.map(partial(self._fetch_page, force=force), range(2, n_pages+1))):
+				print("Fetched page {} of {}.".format(i, n_pages))
+				self._parse_page(p, atcs)
+		with open(pjoin(self.cache_dir, 'is-done'), 'w') as f:
+			f.write(str(datetime.now()))
+	
+	def _fetch_page(self, i: int, force: bool = False) -> str:
+		"""
+		Streams page i to its cache file and returns the path.
+		If the page is already cached (and force is False), the request is conditional on its stored ETag and Last-Modified, and the cached file is kept on a 304.
+		"""
+		p = self._page_path(i)
+		etag_path, modified_path = p + '.etag', p + '.modified'
+		headers = {}
+		if not force and pexists(p):
+			for header, sidecar in [('If-None-Match', etag_path), ('If-Modified-Since', modified_path)]:
+				if pexists(sidecar):
+					with open(sidecar, 'r', encoding='utf8') as f:
+						value = f.read().strip()
+					if len(value) > 0:
+						headers[header] = value
+		with self._session.get(AtcParser.URL.format(page=i), headers=headers, stream=True) as response:
+			if response.status_code == 304:
+				return p
+			response.raise_for_status()
+			# stream to a temp file so an interrupted download never replaces the page or pairs a partial page with its validators
+			tmp = tempfile.NamedTemporaryFile('wb', dir=self.cache_dir, suffix='.tmp', delete=False)
+			try:
+				with tmp:
+					for chunk in response.iter_content(chunk_size=64*1024):
+						tmp.write(chunk)
+				for sidecar in [etag_path, modified_path]:
+					if pexists(sidecar):
+						os.remove(sidecar)
+				os.replace(tmp.name, p)
+			except BaseException:
+				if pexists(tmp.name):
+					os.remove(tmp.name)
+				raise
+			for header, sidecar in [('ETag', etag_path), ('Last-Modified', modified_path)]:
+				with open(sidecar, 'w', encoding='utf8') as f:
+					f.write(response.headers.get(header, ''))
+		return p
+	
+	def _page_path(self, i: int) -> str:
+		return pjoin(self.cache_dir, 'page-{}.txt'.format(i))
+	
+	def _total_pages(self, path: str) -> int:
+		with open(path, 'rb') as f:
+			if ijson is not None:
+				return int(next(ijson.items(f, 'Annotations.TotalPages')))
+			return int(json.load(f)['Annotations']['TotalPages'])
+	
+	def _parse_page(self, path: str, atcs: dict) -> None:
+		"""Parses a cached page, streaming one annotation at a time with ijson if it's installed."""
+		with open(path, 'rb') as f:
+			if ijson is not None:
+				annotations = ijson.items(f, 'Annotations.Annotation.item')
+			else:
+				annotations = json.load(f)['Annotations']['Annotation']
+			for _ in self._parse(annotations, atcs):
+				pass
+	
+	def _parse(self, items: Iterable[dict], atcs: dict):
 		root = atcs['/']
 		for item in items:
 			for v0 in [_['Value']['String'][0] for _ in item['Data'] if _['TOCHeading'] == 'ATC Code']:
 				parent = root
 				for v in v0.split('<br>'):
-					m = pat.match(v.strip())
+					m = _atc_line_pattern.match(v.strip())
 					code, name = m.group(1).strip(), m.group(2).strip()
-					contains = code in atcs
-					if code in atcs:
-						child = atcs[code]
-					else:
+					# codes are unique, so the lookup table alone tells us whether the child is already attached
+					child = atcs.get(code)
+					if child is None:
 						child = Atc(code, name, parent)
-					parent.children.add(child)
-					parent = child
-					if not contains:
+						parent.children.append(child)
 						atcs[child.code] = child
 						yield child
+					parent = child
 				# and it resets parent each loop
 	
 	def __repr__(self):
@@ -2,17 +2,31 @@
 from typing import Callable
 import pandas as pd
 from klgists.files.dl_and_rezip import dl_and_rezip
+try:
+	import pyarrow
+except ImportError:
+	pyarrow = None
+
+# pyarrow's parser is multithreaded, so use it when it's installed and pandas (1.4+) supports it
+_csv_engine = 'pyarrow' if pyarrow is not None and tuple(map(int, pd.__version__.split('.')[:2])) >= (1, 4) else 'c'
+_levels = pd.Index(['Not detected', 'Low', 'Medium', 'High'])
 
 
 def _load(filter_fn: Callable[[pd.DataFrame], pd.DataFrame]=pd.DataFrame.dropna) -> pd.DataFrame:
 	"""Get a DataFrame of Human Protein Atlas tissue expression data, indexed by Gene name and with the 'Gene' and 'Reliability' columns dropped.
-	The expression level ('Level') is replaced using this map: {'Not detected': 0, 'Low': 1, 'Medium': 2, 'High': 3}.
+	The expression level ('Level') is replaced by its int8 code in this order: ['Not detected', 'Low', 'Medium', 'High']; rows with any other level are dropped.
 	Downloads the file from http://www.proteinatlas.org/download/normal_tissue.csv.zip and reloads from normal_tissue.csv.gz thereafter.
 	"""
 	dl_and_rezip('http://www.proteinatlas.org/download/normal_tissue.csv.zip', 'normal_tissue.csv')
-	tissue = pd.read_csv('normal_tissue.csv.gz').drop('Gene', axis=1).drop('Reliability', axis=1)
+	tissue = pd.read_csv(
+		'normal_tissue.csv.gz', engine=_csv_engine,
+		usecols=['Gene name', 'Tissue', 'Cell type', 'Level'],
+		dtype={'Gene name': 'category', 'Tissue': 'category', 'Cell type': 'category', 'Level': 'category'}
+	)
 	tissue = filter_fn(tissue)
-	tissue['Level'] = tissue['Level'].map({'Not detected': 0, 'Low': 1, 'Medium': 2, 'High': 3}.get).astype(float)
+	levels = _levels.get_indexer(tissue['Level'])  # -1 if not found
+	known = levels >= 0
+	tissue = tissue[known].assign(Level=levels[known].astype('int8'))
 	return tissue.set_index('Gene name')
 
 
@@ -23,15 +37,24 @@ class TissueTable(object):
 		tt.tissue('MKNK2') # returns a DataFrame with mean expression of MKNK2 per tissue type. MKN2 is the HGNC symbol.
 	"""
 	def __init__(self):
-		self.df = _load()
+		# sorted so that .loc on the (non-unique) gene index is a binary search rather than a scan
+		self.df = _load().sort_index()
+		# mean levels per (gene, group), computed once per grouping column instead of on every query
+		self._means = {}
+		for group_by in ['Tissue', 'Cell type']:
+			self._means_by(group_by)
 
 	def level(self, gene_name: str, group_by: str='Cell type') -> pd.DataFrame:
 		"""Returns a DataFrame of the mean expression levels by tissue or cell type."""
-		if gene_name not in self.df.index.get_level_values('Gene name'):
+		if gene_name not in self.df.index:
 			raise ValueError("Gene with HGNC symbol {} not found.".format(gene_name))
-		gene = self.df[self.df.index.get_level_values('Gene name') == gene_name]
-		assert gene is not None
-		return gene.groupby(group_by).mean().sort_values('Level', ascending=False)
+		gene = self._means_by(group_by).xs(gene_name, level='Gene name')
+		return gene.sort_values(ascending=False).to_frame('Level')
+
+	def _means_by(self, group_by: str) -> pd.Series:
+		if group_by not in self._means:
+			self._means[group_by] = self.df.groupby(['Gene name', group_by], observed=True)['Level'].mean()
+		return self._means[group_by]
 
 	def tissue(self, name: str):
 		return self.level(name, group_by='Tissue')
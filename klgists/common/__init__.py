@@ -6,6 +6,7 @@ import signal
 import operator
 import logging
 from contextlib import contextmanager, redirect_stdout
+from functools import lru_cache
 from datetime import date, datetime
 from typing import Iterator, TypeVar, Iterable, Optional, List, Any, Sequence, Mapping, overload, Union, Callable
 from hurry.filesize import size as hsize
@@ -13,10 +14,14 @@ from klgists.common.exceptions import LookupFailedException, MultipleMatchesExce
 
 logger = logging.getLogger('klgists')
 
+@lru_cache(maxsize=1024)
+def _attrgetter(attrs: str) -> Callable[[object], Any]:
+	return operator.attrgetter(attrs)
+
 def look(obj: object, attrs: str) -> any:
 	if not isinstance(attrs, str) and isinstance(attrs, Iterable): attrs = '.'.join(attrs)
 	try:
-		return operator.attrgetter(attrs)(obj)
+		return _attrgetter(attrs)(obj)
 	except AttributeError: return None
 
 def flatmap(func, *iterable):
@@ -26,6 +31,7 @@ def flatten(*iterable):
 	return list(chain.from_iterable(iterable))
 
 class DevNull:
+	__slots__ = ('__weakref__',)
 	def write(self, msg): pass
 
 T = TypeVar('T', covariant=True)
@@ -35,26 +41,49 @@ class frozenlist(Sequence):
 	An immutable sequence backed by a list.
 	The sole advantage over a tuple is the list-like __str__ with square brackets, which may be less confusing to a user.
 	"""
+	__slots__ = ('__items', '__hash', '__weakref__')
+
 	def __init__(self, *items: Iterable[T]):
 		self.__items = list(items)
+		self.__hash = None
+
+	def __hash__(self) -> int:
+		# the items never change, so the hash only needs to be computed once
+		if self.__hash is None:
+			self.__hash = hash(tuple(self.__items))
+		return self.__hash
+
+	def __eq__(self, other) -> bool:
+		if self is other:
+			return True
+		if not isinstance(other, frozenlist):
+			return NotImplemented
+		if self.__hash is not None and other.__hash is not None and self.__hash != other.__hash:
+			return False
+		return self.__items == other.__items
 
 	@overload
-	def __getitem__(self, i: int) -> T:
-		return self.__items[i]
+	def __getitem__(self, i: int) -> T: ...
 
 	@overload
-	def __getitem__(self, s: slice) -> frozenlist[T]:
-		return frozenlist(self.__items[s])
+	def __getitem__(self, s: slice) -> frozenlist[T]: ...
 
-	def __getitem__(self, item) -> T:
-		if isinstance(item, slice):
-			return self[item]
-		else:
-			return self[item]
+	def __getitem__(self, item):
+		if item.__class__ is slice:
+			# the slice is already a new list, so skip __init__ copying it again
+			new = frozenlist.__new__(frozenlist)
+			new.__items = self.__items[item]
+			new.__hash = None
+			return new
+		return self.__items[item]
 
 	def __len__(self) -> int:
 		return len(self.__items)
 
+	def __reduce__(self):
+		# leave out the cached hash, which is only valid for this process's hash seed
+		return frozenlist, tuple(self.__items)
+
 	def __repr__(self):
 		return repr(self.__items)
 
@@ -78,6 +107,21 @@ def pardir(path: str, depth: int=1):
 def grandpardir(path: str):
 	return pardir(path, 2)
 
+def _write_stdout(msg: str) -> None:
+	sys.stdout.write(msg)  # look up sys.stdout on each call so that redirection still works
+
+def _write_stderr(msg: str) -> None:
+	sys.stderr.write(msg)
+
+_stream_log_functions = {'print': _write_stdout, 'stdout': _write_stdout, 'stderr': _write_stderr}
+_logger_level_names = frozenset({'debug', 'info', 'warning', 'error', 'critical'})
+
+def _logger_level_function(level: str) -> Callable[[str], None]:
+	level = level.lower()
+	if level not in _logger_level_names:
+		raise LookupFailedException("No logging level {}".format(level))
+	return getattr(logger, level)
+
 def get_log_function(log: Union[None, str, Callable[[str], None]]) -> Callable[[str], None]:
 	"""
 	Gets a logging function from user input.
@@ -92,14 +136,12 @@ def get_log_function(log: Union[None, str, Callable[[str], None]]) -> Callable[[
 	"""
 	if log is None:
 		return logger.info
-	elif log in ['print', 'stdout']:
-		return lambda msg: sys.stdout.write(msg)
-	elif log == 'stderr':
-		return lambda msg: sys.stderr.write(msg)
-	elif isinstance(log, int):
-		return getattr(logger, logging.getLevelName(log))
 	elif isinstance(log, str):
-		return getattr(logger, logging.getLevelName(log.upper()))
+		if log in _stream_log_functions:
+			return _stream_log_functions[log]
+		return _logger_level_function(log)
+	elif isinstance(log, int):
+		return _logger_level_function(logging.getLevelName(log))
 	elif callable(log):
 		return log
 	elif hasattr(log, 'write') and getattr(log, 'write'):
@@ -112,12 +154,15 @@ class LogWriter:
 	A call to a logger at some level, pretending to be a writer.
 	Has a write method, as well as flush and close methods that do nothing.
 	"""
+	__slots__ = ('level', '_log', '__weakref__')
+
 	def __init__(self, level: Union[int, str]):
-		if isinstance(level, str): level = level.upper()
-		self.level = logging.getLevelName(level)
+		# keep the name: getLevelName maps names to numbers, and the logger's methods are named by level
+		self.level = logging.getLevelName(level) if isinstance(level, int) else level.upper()
+		self._log = _logger_level_function(self.level)
 
 	def write(self, msg: str):
-		getattr(logger, self.level)(msg)
+		self._log(msg)
 
 	def flush(self): pass
 	def close(self): pass
@@ -129,22 +174,36 @@ class LogWriter:
 		self.close()
 
 
+def _bound_methods(objs: Iterable[object], name: str) -> Iterator[Callable[[], Any]]:
+	for obj in objs:
+		method = getattr(obj, name, None)
+		if method is not None:
+			yield method
+
+
 class DelegatingWriter(object):
 	# we CANNOT override TextIOBase: It causes hangs
+	__slots__ = ('_writers', '_writes', '_flushes', '_closes', '__weakref__')
+
 	def __init__(self, *writers):
-		self._writers = writers
+		self._writers = tuple(writers)
+		# bound once, so each call is a plain call per writer rather than a method lookup
+		# write-only writers like DevNull have nothing to flush or close, so they're skipped for those
+		self._writes = tuple(writer.write for writer in writers)
+		self._flushes = tuple(_bound_methods(writers, 'flush'))
+		self._closes = tuple(_bound_methods(writers, 'close'))
 
 	def write(self, s):
-		for writer in self._writers:
-			writer.write(s)
+		for write in self._writes:
+			write(s)
 
 	def flush(self):
-		for writer in self._writers:
-			writer.flush()
+		for flush in self._flushes:
+			flush()
 
 	def close(self):
-		for writer in self._writers:
-			writer.close()
+		for close in self._closes:
+			close()
 
 	def __enter__(self):
 		return self
@@ -157,6 +216,7 @@ class Capture:
 	A lazy string-like object that wraps around a StringIO result.
 	It's too hard to fully subclass a string while keeping it lazy.
 	"""
+	__slots__ = ('__cio', '__weakref__')
 	def __init__(self, cio):
 		self.__cio = cio
 	@property
@@ -167,7 +227,7 @@ class Capture:
 		return self.__cio.getvalue()
 	def __repr__(self): return self.__cio.getvalue()
 	def __str__(self): return self.__cio.getvalue()
-	def __len__(self): return len(repr(self))
+	def __len__(self): return len(self.__cio.getvalue())
 	def split(self, x): return self.__cio.getvalue().split(x)
 
 @contextmanager
@@ -248,37 +308,39 @@ def decorator(cls):
 	return cls
 
 
+def _mark_exhausted(axis: int, exhausted: List[int]) -> Iterator[Any]:
+	"""Records `axis` in `exhausted` when iterated, without yielding anything."""
+	exhausted.append(axis)
+	yield from ()
+
 def zip_strict(*args):
-	"""Same as zip(), but raises an IndexError if the lengths don't match."""
-	# we need to catch these cases before or they'll fail
-	# in particular, 1 element would fail with a LengthMismatchError
-	# and 0 elements would loop forever
+	"""Same as zip(), but raises a LengthMismatchError if the lengths don't match."""
+	# with fewer than 2 iterables the lengths can't mismatch
+	# in particular, 0 elements would otherwise loop forever
 	if len(args) < 2:
-		return zip(*args)
-	iters = [iter(axis) for axis in args]
+		yield from zip(*args)
+		return
+	# the built-in zip does the iteration; each iterable is chained to a marker that records when it runs out
+	exhausted = []
+	iters = [chain(axis, _mark_exhausted(i, exhausted)) for i, axis in enumerate(args)]
 	n_elements = 0
-	failures = []
-	while len(failures) == 0:
-		values = []
-		failures = []
-		for axis, iterator in enumerate(iters):
-			try:
-				values.append(next(iterator))
-			except StopIteration:
-				failures.append(axis)
-		if len(failures) == 0:
-			yield tuple(values)
-		elif len(failures) == 1:
-			raise LengthMismatchError("Too few elements ({}) along axis {}".format(n_elements, failures[0]))
-		elif len(failures) < len(iters):
-			raise LengthMismatchError("Too few elements ({}) along axes {}".format(n_elements, failures))
-		n_elements += 1
+	for n_elements, values in enumerate(zip(*iters), 1):
+		yield values
+	# zip stopped at the first exhausted axis; the axes before it each had another element
+	for iterator in iters[exhausted[0] + 1:]:
+		next(iterator, None)
+	if len(exhausted) == 1:
+		raise LengthMismatchError("Too few elements ({}) along axis {}".format(n_elements, exhausted[0]))
+	elif len(exhausted) < len(iters):
+		raise LengthMismatchError("Too few elements ({}) along axes {}".format(n_elements, exhausted))
 
 def zip_list(*args) -> List[Any]:
 	"""Same as zip_strict, but converts to a list and can provide a more detailed error message."""
 	try:
 		return list(zip_strict(*args))
 	except LengthMismatchError:
+		# iterators have no len(); keep zip_strict's message for those
+		if not all(hasattr(x, '__len__') for x in args): raise
 		raise LengthMismatchError("Length mismatch in zip_strict: Sizes are {}".format([len(x) for x in args])) from None
 zip_strict_list = zip_list  # for historical use
 
@@ -308,9 +370,9 @@ def read_lines_file(path: str, ignore_comments: bool = False) -> Sequence[str]:
 	"""
 	lines = []
 	with open(path) as f:
-		for line in f.readlines():
+		for line in f:
 			line = line.strip()
-			if not ignore_comments or not line.startswith('#') and not len(line.strip()) == 0:
+			if not ignore_comments or (len(line) > 0 and not line.startswith('#')):
 				lines.append(line)
 	return lines
 
@@ -331,13 +393,13 @@ def read_properties_file(path: str) -> Mapping[str, str]:
 	"""
 	dct = {}
 	with open(path) as f:
-		for i, line in enumerate(f.readlines()):
+		for i, line in enumerate(f):
 			line = line.strip()
 			if len(line) == 0 or line.startswith('#'): continue
-			if line.count('=') != 1:
+			k, sep, v = line.partition('=')
+			if not sep or '=' in v:
 				raise ParsingFailedException("Bad line {} in {}".format(i, path))
-			parts = line.split('=')
-			dct[parts[0].strip()] = parts[1].strip()
+			dct[k.strip()] = v.strip()
 	return dct
 
 def json_serial(obj):
@@ -3,7 +3,8 @@ A collection of decorators.
 """
 
 from typing import Optional, Callable, Set, Type
-import signal, time
+import threading, time
+import operator
 from functools import wraps
 from abc import abstractmethod, ABC, ABCMeta
 from functools import total_ordering
@@ -31,53 +32,101 @@ class _InfoSpecialStr(SpecialStr):
 	def _repr_html_(self):
 		if len(self.s) == 0: return self.s
 		lines = self.s.split('\n')
-		built = '<strong>' + lines[0] + '</strong><br/>\n'
-		if len(lines) > 1:
-			for line in lines[1:-1]:
-				if '=' in line:
-					k, v = line[:line.index('=')], line[line.index('='):]
-					built += '&emsp;&emsp;&emsp;&emsp;<strong>' + k + '</strong>' + v + '<br/>\n'
-				else:
-					built += line + '<br />\n'
-		built += '<strong>)</strong>\n'
-		return str(built)
-
-
-def _var_items(obj, only, exclude):
-	return [
-		(key, value)
-		for key, value in vars(obj).items()
-		if (only is None) or (key in only)
-		if not exclude(key)
-	]
-
-def _var_values(obj, only, exclude):
-	items = vars(obj).items()
-	return [value for key, value in items if ((only is None) or key in only) and not exclude(key) and value is not None]
-
-def _auto_hash(self, only: Optional[Set[str]], exclude: Optional[Callable[[str], bool]]):
-	if exclude is None: exclude = lambda _: False
-	return hash(tuple(_var_values(self, only, exclude)))
-
-def _auto_eq(self, other, only: Optional[Set[str]], exclude: Optional[Callable[[str], bool]]):
+		built = ['<strong>', lines[0], '</strong><br/>\n']
+		for line in lines[1:-1]:
+			k, eq, v = line.partition('=')
+			if eq:
+				built += ['&emsp;&emsp;&emsp;&emsp;<strong>', k, '</strong>', eq, v, '<br/>\n']
+			else:
+				built += [line, '<br />\n']
+		built.append('<strong>)</strong>\n')
+		return ''.join(built)
+
+
+class _Excluded(dict):
+	"""
+	Memoizes an `exclude` predicate by attribute name.
+	A hit is a plain dict lookup, so `exclude` runs once per name rather than once per attribute on every call.
+	"""
+	__slots__ = ('_exclude',)
+
+	def __init__(self, exclude: Callable[[str], bool]):
+		super().__init__()
+		self._exclude = exclude
+
+	def __missing__(self, key: str) -> bool:
+		value = self[key] = bool(self._exclude(key))
+		return value
+
+
+def _merge_excludes(*excludes: Optional[Callable[[str], bool]]) -> Optional[Callable[[str], bool]]:
+	excludes = [e for e in excludes if e is not None]
+	if len(excludes) == 0: return None
+	if len(excludes) == 1: return excludes[0]
+	return lambda a: any(e(a) for e in excludes)
+
+
+class _AttrSelector:
+	"""
+	Picks out the instance attributes accepted by `only` and `exclude`.
+	Built once per decorated class, with `only` as a frozenset, `exclude` memoized per name,
+	and a comprehension specialized to which filters are set.
+	"""
+	__slots__ = ('items', 'values')
+
+	def __init__(self, only: Optional[Set[str]], exclude: Optional[Callable[[str], bool]]):
+		only = None if only is None else frozenset(only)
+		excluded = None if exclude is None else _Excluded(exclude)
+		# values skip Nones
+		if only is None and excluded is None:
+			self.items = lambda obj: list(vars(obj).items())
+			self.values = lambda obj: tuple([v for v in vars(obj).values() if v is not None])
+		elif excluded is None:
+			self.items = lambda obj: [(k, v) for k, v in vars(obj).items() if k in only]
+			self.values = lambda obj: tuple([v for k, v in vars(obj).items() if v is not None and k in only])
+		elif only is None:
+			self.items = lambda obj: [(k, v) for k, v in vars(obj).items() if not excluded[k]]
+			self.values = lambda obj: tuple([v for k, v in vars(obj).items() if v is not None and not excluded[k]])
+		else:
+			self.items = lambda obj: [(k, v) for k, v in vars(obj).items() if k in only and not excluded[k]]
+			self.values = lambda obj: tuple([
+				v for k, v in vars(obj).items() if v is not None and k in only and not excluded[k]
+			])
+
+
+def _auto_hash(self, selector: _AttrSelector):
+	return hash(selector.values(self))
+
+def _auto_eq(self, other, selector: _AttrSelector):
 	if type(self) != type(other):
 		raise TypeError("Type {} is not the same as type {}".format(type(self), type(other)))
-	if exclude is None: exclude = lambda _: False
-	return _var_values(self, only=only, exclude=exclude) == _var_values(other, only, exclude)
+	return selector.values(self) == selector.values(other)
+
+
+def _eq_hash_selector(only: Optional[Set[str]], exclude: Optional[Callable[[str], bool]]) -> _AttrSelector:
+	"""
+	Builds the selector for auto_eq and auto_hash.
+	If `only` is given, `exclude` is applied to it once, here, rather than to each attribute on every call.
+	Either way, attributes are compared in the instance's order and Nones are skipped; `only` just narrows which are included.
+	"""
+	if only is not None and exclude is not None:
+		return _AttrSelector([name for name in only if not exclude(name)], None)
+	return _AttrSelector(only, exclude)
 
 
 @decorator
 def auto_eq(only: Optional[Set[str]] = None, exclude: Optional[Callable[[str], bool]] = None):
 	"""
 	Decorator.
-	Auto-adds a __hash__ function by hashing its attributes.
+	Auto-adds an __eq__ function by comparing its attributes.
 	:param only: Only include these attributes
 	:param exclude: Exclude these attributes
 	"""
 	@wraps(auto_eq)
 	def dec(cls):
+		selector = _eq_hash_selector(only, exclude)
 		def __eq(self, other):
-			return _auto_eq(self, other, only, exclude)
+			return _auto_eq(self, other, selector)
 		cls.__eq__ = __eq
 		return cls
 	return dec
@@ -93,8 +142,9 @@ def auto_hash(only: Optional[Set[str]] = None, exclude: Optional[Callable[[str],
 	"""
 	@wraps(auto_hash)
 	def dec(cls):
+		selector = _eq_hash_selector(only, exclude)
 		def __hash(self):
-			return _auto_hash(self, only, exclude)
+			return _auto_hash(self, selector)
 		cls.__hash__ = __hash
 		return cls
 	return dec
@@ -102,21 +152,18 @@ def auto_hash(only: Optional[Set[str]] = None, exclude: Optional[Callable[[str],
 
 def _gen_str(
 		self,
-		only: Optional[Set[str]] = None,
-		exclude: Optional[Callable[[str], bool]] = None,
+		selector: _AttrSelector,
 		bold_surround: Callable[[str], str] = str, em_surround: Callable[[str], str] = str,
 		delim: str = ', ', eq: str = '=', opening: str = '(', closing: str = ')',
 		with_address: bool = True
 ):
-	if exclude is None: exclude = lambda _: False
-	_vars = _var_items(self, only, exclude)
-	return (
-		bold_surround(self.__class__.__name__) +
-		opening +
-		delim.join([k + eq + str(v) for k, v in _vars]) +
-		em_surround(' @ ' + str(hex(id(self))) if with_address else '') +
+	return ''.join([
+		bold_surround(self.__class__.__name__),
+		opening,
+		delim.join([k + eq + str(v) for k, v in selector.items(self)]),
+		em_surround(' @ ' + hex(id(self)) if with_address else ''),
 		closing
-	)
+	])
 
 @decorator
 def auto_repr(
@@ -124,8 +171,9 @@ def auto_repr(
 ):
 	@wraps(auto_repr)
 	def dec(cls):
+		selector = _AttrSelector(only, exclude)
 		def __repr(self):
-			return _gen_str(self, only=only, exclude=exclude, with_address=True)
+			return _gen_str(self, selector, with_address=True)
 		cls.__repr__ = __repr
 		return cls
 	return dec
@@ -139,8 +187,9 @@ def auto_str(
 ):
 	@wraps(auto_str)
 	def dec(cls):
+		selector = _AttrSelector(only, exclude)
 		def __str(self):
-			return _gen_str(self, only=only, exclude=exclude, with_address=with_address)
+			return _gen_str(self, selector, with_address=with_address)
 		cls.__str__ = __str
 		return cls
 	return dec
@@ -154,8 +203,9 @@ def auto_html(
 ):
 	@wraps(auto_html)
 	def dec(cls):
+		selector = _AttrSelector(only, exclude)
 		def __html(self):
-			return SpecialStr(_gen_str(self, only=only, exclude=exclude, with_address=with_address, bold_surround = lambda c: '<strong>' + c + '</strong>', em_surround = lambda c: '<em>' + c + '</em>'))
+			return SpecialStr(_gen_str(self, selector, with_address=with_address, bold_surround = lambda c: '<strong>' + c + '</strong>', em_surround = lambda c: '<em>' + c + '</em>'))
 		cls._repr_html = __html
 		return cls
 	return dec
@@ -184,12 +234,16 @@ def auto_repr_str(
 	"""
 	@wraps(auto_repr_str)
 	def dec(cls):
+		# merged once here, as documented above: exclude_all applies to everything, and exclude_simple to _repr_html_ too
+		simple = _AttrSelector(None, _merge_excludes(exclude_all, exclude_simple))
+		html = _AttrSelector(None, _merge_excludes(exclude_all, exclude_simple, exclude_html))
+		everything = _AttrSelector(None, exclude_all)
 		def __str(self):
-			return _gen_str(self, only=None, exclude=exclude_simple, with_address=False)
+			return _gen_str(self, simple, with_address=False)
 		def __html(self):
-			return SpecialStr(_gen_str(self, only=None, exclude=exclude_html, with_address=True, bold_surround = lambda c: '<strong>' + c + '</strong>', em_surround = lambda c: '<em>' + c + '</em>'))
+			return SpecialStr(_gen_str(self, html, with_address=True, bold_surround = lambda c: '<strong>' + c + '</strong>', em_surround = lambda c: '<em>' + c + '</em>'))
 		def __repr(self):
-			return _gen_str(self, only=None, exclude=exclude_all, with_address=True)
+			return _gen_str(self, everything, with_address=True)
 		cls.__str__ = __str
 		cls.__repr__ = __repr
 		cls._repr_html_ = __html
@@ -207,8 +261,9 @@ def auto_info(only: Optional[Set[str]] = None, exclude: Optional[Callable[[str],
 	"""
 	@wraps(auto_info)
 	def dec(cls):
+		selector = _AttrSelector(only, exclude)
 		def __info(self):
-			return _InfoSpecialStr(_gen_str(self, delim='\n\t', eq=' = ', opening='(\n\t', closing='\n)', with_address=False, only=only, exclude=exclude))
+			return _InfoSpecialStr(_gen_str(self, selector, delim='\n\t', eq=' = ', opening='(\n\t', closing='\n)', with_address=False))
 		cls.info = __info
 		return cls
 	return dec
@@ -220,16 +275,17 @@ def auto_obj():
 	Auto-adds __eq__, __hash__, __repr__, __str__, and _repr_html_.
 	See the decorators for auto_eq, auto_hash, and auto_repr for more details.
 	"""
+	public, everything = _AttrSelector(None, lambda a: a.startswith('_')), _AttrSelector(None, None)
 	def __str(self):
-		return _gen_str(self, exclude=lambda a: a.startswith('_'), with_address=False)
+		return _gen_str(self, public, with_address=False)
 	def __html(self):
-		return SpecialStr(_gen_str(self, only=None, exclude=lambda a: a.startswith('_'), with_address=True, bold_surround = lambda c: '<strong>' + c + '</strong>'))
+		return SpecialStr(_gen_str(self, public, with_address=True, bold_surround = lambda c: '<strong>' + c + '</strong>'))
 	def __repr(self):
-		return _gen_str(self, exclude=lambda _: False, with_address=True)
+		return _gen_str(self, everything, with_address=True)
 	def __hash(self):
-		return _auto_hash(self, only=None, exclude=None)
-	def __eq(self):
-		return _auto_eq(self, None, only=None, exclude=None)
+		return _auto_hash(self, everything)
+	def __eq(self, other):
+		return _auto_eq(self, other, everything)
 	@wraps(auto_obj)
 	def dec(cls):
 		cls.__eq__ = __eq
@@ -330,9 +386,10 @@ def float_type(attribute: str):
 	Used to annotate a class as being "essentially an float".
 	:param attribute: The name of the attribute of this class
 	"""
+	getter = operator.attrgetter(attribute)
 	@wraps(float_type)
 	def dec(cls):
-		cls.__float__ = lambda: float(getattr(cls, attribute))
+		cls.__float__ = lambda self: float(getter(self))
 		return cls
 	return dec
 
@@ -344,9 +401,10 @@ def int_type(attribute: str):
 	Used to annotate a class as being "essentially an integer".
 	:param attribute: The name of the attribute of this class
 	"""
+	getter = operator.attrgetter(attribute)
 	@wraps(int_type)
 	def dec(cls):
-		cls.__float__ = lambda: float(getattr(cls, attribute))
+		cls.__int__ = lambda self: int(getter(self))
 		return cls
 	return dec
 
@@ -359,9 +417,10 @@ def iterable_over(attribute: str):
 	Used to annotate a class as being "essentially an iterable" over some elements.
 	:param attribute: The name of the attribute of this class
 	"""
+	getter = operator.attrgetter(attribute)
 	@wraps(iterable_over)
 	def dec(cls):
-		cls.__iter__ = lambda: iter(getattr(cls, attribute))
+		cls.__iter__ = lambda self: iter(getter(self))
 		return cls
 	return dec
 
@@ -374,10 +433,11 @@ def collection_over(attribute: str):
 	Used to annotate a class as being "essentially a collection" over some elements.
 	:param attribute: The name of the attribute of this class
 	"""
+	getter = operator.attrgetter(attribute)
 	@wraps(collection_over)
 	def dec(cls):
-		cls.__iter__ = lambda: iter(getattr(cls, attribute))
-		cls.__len__ = lambda: len(getattr(cls, attribute))
+		cls.__iter__ = lambda self: iter(getter(self))
+		cls.__len__ = lambda self: len(getter(self))
 		return cls
 	return dec
 
@@ -391,10 +451,11 @@ def sequence_over(attribute: str):
 	Used to annotate a class as being "essentially a list" over some elements.
 	:param attribute: The name of the attribute of this class
 	"""
+	getter = operator.attrgetter(attribute)
 	@wraps(sequence_over)
 	def dec(cls):
-		cls.__getitem__ = lambda e: getattr(cls, attribute)[e]
-		cls.__len__ = lambda: len(getattr(cls, attribute))
+		cls.__getitem__ = lambda self, e: getter(self)[e]
+		cls.__len__ = lambda self: len(getter(self))
 		return cls
 	return dec
 
@@ -407,28 +468,50 @@ def auto_singleton(cls):
 	>>> @auto_singleton
 	>>> class MyClass: pass
 	>>> mysingleton = MyClass()
-	"""
-	instances = {}
-	def get_instance():
-		if cls not in instances:
-			instances[cls] = cls()
-		return instances[cls]
-	return get_instance
+	The decorated class stays a class, so isinstance checks against it still work.
+	Each subclass gets its own singleton, but it must not define __init__, which would run on every call.
+	"""
+	new, init = cls.__new__, cls.__init__
+	def __new__(kls):
+		# looked up in kls's own namespace so that a subclass doesn't get its parent's instance
+		instance = kls.__dict__.get('_singleton_instance')
+		if instance is None:
+			instance = new(kls)
+			init(instance)
+			kls._singleton_instance = instance
+		return instance
+	def __init__(self):
+		pass  # already initialized, once, by __new__
+	cls.__new__ = staticmethod(__new__)
+	cls.__init__ = __init__
+	return cls
 
 
 @decorator
 def auto_timeout(seconds: int):
+	"""
+	Decorator.
+	Raises a TimeoutError if the call takes longer than `seconds`.
+	The call runs on a daemon thread, so this works off the main thread and on Windows,
+	but a call that times out can't be interrupted: it keeps running in the background.
+	"""
 	@wraps(auto_timeout)
 	def dec(func):
-		def _handle_timeout(the_signal, the_frame):
-			raise TimeoutError("The call timed out")
 		def my_fn(*args, **kwargs):
-			signal.signal(signal.SIGALRM, _handle_timeout)
-			signal.alarm(seconds)
-			try:
-				result = func(*args, **kwargs)
-			finally:
-				signal.alarm(0)
+			outcome = []
+			def run():
+				try:
+					outcome.append((True, func(*args, **kwargs)))
+				except BaseException as e:
+					outcome.append((False, e))
+			thread = threading.Thread(target=run, name='auto_timeout-' + func.__name__, daemon=True)
+			thread.start()
+			thread.join(seconds)
+			if thread.is_alive():
+				raise TimeoutError("The call timed out")
+			succeeded, result = outcome[0]
+			if not succeeded:
+				raise result
 			return result
 		return wraps(func)(my_fn)
 	return dec
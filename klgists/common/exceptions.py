@@ -40,6 +40,9 @@ class ExternalCommandFailed(IOError):
 		self.exit_code = exit_code
 		self.stdout = stdout
 		self.stderr = stderr
+	def __reduce__(self):
+		# the default only passes args (the message) back to __init__
+		return self.__class__, (self.args[0], self.command, self.exit_code, self.stdout, self.stderr), self.__dict__
 	def extended_message(self) -> str:
 		return "Command `{}` failed with exit code `{}`.\nstdout:{}\nstderr:{}"\
 			.format(self.command, self.exit_code, self._x(self.stdout), self._x(self.stderr))
@@ -35,10 +35,11 @@ class FlexibleLogger:
 
 	def _make_dirs(self, output_dir: str) -> None:
 		# note that we can't import from klgists.files (common shouldn't depend on files)
-		if not os.path.exists(output_dir):
-			os.makedirs(output_dir)
-		elif not os.path.isdir(output_dir):
-			raise InvalidDirectoryException("{} already exists and is not a directory".format(output_dir))
+		if output_dir == '': return  # a bare filename goes in the working directory
+		try:
+			os.makedirs(output_dir, exist_ok=True)
+		except FileExistsError:
+			raise InvalidDirectoryException("{} already exists and is not a directory".format(output_dir)) from None
 
 
 class LoggingFormatterBuilder:
@@ -53,25 +54,26 @@ class LoggingFormatterBuilder:
 		.message(left=': ')\
 		.build()
 	"""
-	_s = None
-	def __init__(self) -> None: self._s = ''
-	def __repr__(self) -> str: return "LoggingFormatterBuilder({})".format(self._s)
+	_parts = None
+	def __init__(self) -> None: self._parts = []  # joined once in build() rather than concatenated per call
+	def __repr__(self) -> str: return "LoggingFormatterBuilder({})".format(''.join(self._parts))
 	def __str__(self) -> str: return repr(self)
 
-	def level_num(self, left: str = ' ', right: str = ''): self._s += left + '%(levelno)s' + right; return self
-	def level_name(self, left: str = ' ', right: str = ''): self._s += left + '%(levelname)s' + right; return self
-	def level_name_fixed_width(self, left: str = ' ', right: str = ''): self._s += left + '%(levelname)-8s' + right; return self
-	def name(self, left: str = ' ', right: str = ''): self._s += left + '%(name)s' + right; return self
-	def module(self, left: str = ' ', right: str = ''): self._s += left + '%(module)s' + right; return self
-	def message(self, left: str = ' ', right: str = ''): self._s += left + '%(message)s' + right; return self
-	def thread_id(self, left: str = ' ', right: str = ''): self._s += left + '%(thread)d' + right; return self
-	def thread_name(self, left: str = ' ', right: str = ''): self._s += left + '%(threadName)s' + right; return self
-	def asc_time(self, left: str = ' ', right: str = ''): self._s += left + '%(asctime)s' + right; return self
-	def line_num(self, left: str = ' ', right: str = ''): self._s += left + '%(lineno)d' + right; return self
-	def other(self, format: str, left: str = ' ', right: str = ''): self._s += left + format + right; return self
+	def level_num(self, left: str = ' ', right: str = ''): self._parts.append(left + '%(levelno)s' + right); return self
+	def level_name(self, left: str = ' ', right: str = ''): self._parts.append(left + '%(levelname)s' + right); return self
+	def level_name_fixed_width(self, left: str = ' ', right: str = ''): self._parts.append(left + '%(levelname)-8s' + right); return self
+	def name(self, left: str = ' ', right: str = ''): self._parts.append(left + '%(name)s' + right); return self
+	def module(self, left: str = ' ', right: str = ''): self._parts.append(left + '%(module)s' + right); return self
+	def message(self, left: str = ' ', right: str = ''): self._parts.append(left + '%(message)s' + right); return self
+	def thread_id(self, left: str = ' ', right: str = ''): self._parts.append(left + '%(thread)d' + right); return self
+	def thread_name(self, left: str = ' ', right: str = ''): self._parts.append(left + '%(threadName)s' + right); return self
+	def asc_time(self, left: str = ' ', right: str = ''): self._parts.append(left + '%(asctime)s' + right); return self
+	def line_num(self, left: str = ' ', right: str = ''): self._parts.append(left + '%(lineno)d' + right); return self
+	def other(self, format: str, left: str = ' ', right: str = ''): self._parts.append(left + format + right); return self
 
 	def build(self) -> logging.Formatter:
-		return logging.Formatter(self._s[min(1, len(self._s)) :])
+		s = ''.join(self._parts)
+		return logging.Formatter(s[min(1, len(s)) :])
 
 
 __all__ = ['FlexibleLogger', 'LoggingFormatterBuilder']
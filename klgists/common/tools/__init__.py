@@ -30,6 +30,7 @@ class JsonEncoder(json.JSONEncoder):
 
 
 class Writeable(metaclass=abc.ABCMeta):
+	__slots__ = ()
 
 	def write(self, msg):
 		raise NotImplementedError()
@@ -49,6 +50,7 @@ class Writeable(metaclass=abc.ABCMeta):
 
 class DevNull(Writeable):
 	"""Pretends to write but doesn't."""
+	__slots__ = ('__weakref__',)
 	def write(self, msg): pass
 	def flush(self): pass
 	def close(self): pass
@@ -95,6 +97,9 @@ class VeryCommonTools:
 			return t
 
 
+_function_type = type(lambda: 0)
+
+
 class CommonTools(VeryCommonTools):
 
 	@staticmethod
@@ -103,29 +108,7 @@ class CommonTools(VeryCommonTools):
 		Same as zip(), but raises an IndexError if the lengths don't match.
 		:raises: LengthMismatchError
 		"""
-		# we need to catch these cases before or they'll fail
-		# in particular, 1 element would fail with a LengthMismatchError
-		# and 0 elements would loop forever
-		if len(args) < 2:
-			yield from zip(*args)
-		iters = [iter(axis) for axis in args]
-		n_elements = 0
-		failures = []
-		while len(failures) == 0:
-			values = []
-			failures = []
-			for axis, iterator in enumerate(iters):
-				try:
-					values.append(next(iterator))
-				except StopIteration:
-					failures.append(axis)
-			if len(failures) == 0:
-				yield tuple(values)
-			elif len(failures) == 1:
-				raise LengthMismatchError("Too few elements ({}) along axis {}".format(n_elements, failures[0]))
-			elif len(failures) < len(iters):
-				raise LengthMismatchError("Too few elements ({}) along axes {}".format(n_elements, failures))
-			n_elements += 1
+		return zip_strict(*args)
 
 	@staticmethod
 	def zip_list(*args) -> List[Tuple[Any]]:
@@ -206,12 +189,7 @@ class CommonTools(VeryCommonTools):
 
 	@staticmethod
 	def is_lambda(function: Any) -> bool:
-		LAMBDA = lambda: 0
-		if not hasattr(function, '__name__'): return False  # not a function
-		return (
-				isinstance(function, type(LAMBDA)) and function.__name__ == LAMBDA.__name__
-				or str(function).startswith('<function <lambda> at ') and str(function).endswith('>')
-		)
+		return isinstance(function, _function_type) and function.__name__ == '<lambda>'
 
 	@staticmethod
 	def multidict(
@@ -301,7 +279,7 @@ class CommonTools(VeryCommonTools):
 			name: str = 'collection') -> Any:
 		"""
 		Returns either the SINGLE (ONLY) UNIQUE ITEM in the sequence or raises an exception.
-		Each item must have __hash__ defined on it.
+		Items are compared with ==, so they don't need to be hashable.
 		:param sequence: A list of any items (untyped)
 		:param condition: If nonnull, consider only those matching this condition
 		:param name: Just a name for the collection to use in an error message
@@ -310,21 +288,23 @@ class CommonTools(VeryCommonTools):
 		:raises: MultipleMatchesException If there is more than one unique item.
 		"""
 
-		def _only(sq):
-			st = set(sq)
-			if len(st) > 1:
-				raise MultipleMatchesException("More then 1 item in " + str(name))
-			if len(st) == 0:
-				raise LookupError("Empty " + str(name))
-			return next(iter(st))
-
 		if condition and isinstance(condition, str):
-			return _only([s for s in sequence if
-				(not getattr(s, condition[1:]) if condition.startswith('!') else getattr(s, condition))])
-		elif condition:
-			return _only([s for s in sequence if condition(s)])
-		else:
-			return _only(sequence)
+			attr = condition[1:] if condition.startswith('!') else condition
+			if condition.startswith('!'):
+				condition = lambda s: not getattr(s, attr)
+			else:
+				condition = lambda s: getattr(s, attr)
+		# single pass, stopping at the second distinct item
+		first = _no_item = object()
+		for s in sequence:
+			if condition and not condition(s): continue
+			if first is _no_item:
+				first = s
+			elif s != first:
+				raise MultipleMatchesException("More then 1 item in " + str(name))
+		if first is _no_item:
+			raise LookupError("Empty " + str(name))
+		return first
 
 	@staticmethod
 	def iterator_has_elements(x: Iterator[Any]) -> bool:
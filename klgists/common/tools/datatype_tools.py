@@ -10,6 +10,7 @@ from copy import copy
 
 
 import os
+import math
 import numpy as np
 import pandas as pd
 import re
@@ -17,6 +18,16 @@ import re
 PLike = Union[str, PurePath, os.PathLike]
 V = TypeVar('V')
 
+_real_scalar_types = (int, float, np.integer, np.floating)
+
+def _int_extreme(builtin, numpy_fn, f: tuple) -> int:
+	# builtin min/max are much faster for plain numbers, but only np.min/np.max handle arrays and nesting
+	if all(isinstance(x, _real_scalar_types) for x in f):
+		return int(builtin(f))
+	if len(f) == 1 and isinstance(f[0], (list, tuple)) and all(isinstance(x, _real_scalar_types) for x in f[0]):
+		return int(builtin(f[0]))
+	return int(numpy_fn(f))
+
 
 class NumericTools(VeryCommonTools):
 
@@ -26,58 +37,60 @@ class NumericTools(VeryCommonTools):
 
 	@staticmethod
 	def iroundopt(f: Optional[SupportsInt]) -> int:
-		# noinspection PyTypeChecker
-		return None if f is None else int(np.round(f))
+		return None if f is None else round(float(f))
 
 	@staticmethod
 	def iceilopt(f: Optional[SupportsInt]) -> int:
-		# noinspection PyTypeChecker
-		return None if f is None else int(np.ceil(f))
+		return None if f is None else math.ceil(float(f))
 
 	@staticmethod
 	def iflooropt(f: Optional[SupportsInt]) -> int:
-		# noinspection PyTypeChecker
-		return None if f is None else int(np.floor(f))
+		return None if f is None else math.floor(float(f))
 
 	@staticmethod
 	def iround(f: Optional[SupportsInt]) -> int:
-		# noinspection PyTypeChecker
-		return None if f is None else int(np.round(f))
+		return None if f is None else round(float(f))
 
 	@staticmethod
 	def iceil(f: SupportsFloat) -> int:
 		"""
-		Fixes np.ceil to return an Python integer rather than a Numpy float.
+		Returns the ceiling as a Python integer, using math.ceil rather than Numpy.
 		:param f: A Python or Numpy float, or something else that defines __float__
 		:return: An integer of the ceiling
 		"""
-		# noinspection PyTypeChecker
-		return int(np.ceil(f))
+		return math.ceil(float(f))
 
 	@staticmethod
 	def ifloor(f: SupportsFloat) -> int:
 		"""
-		Fixes np.floor to return an Python integer rather than a Numpy float.
+		Returns the floor as a Python integer, using math.floor rather than Numpy.
 		:param f: A Python or Numpy float, or something else that defines __float__
 		:return: An integer of the ceiling
 		"""
-		# noinspection PyTypeChecker
-		return int(np.floor(f))
+		return math.floor(float(f))
 
 	@staticmethod
 	def imin(*f):
-		return int(np.min(f))
+		"""The minimum of all the values as a Python int, like np.min; the arguments can be numbers, sequences, or arrays."""
+		return _int_extreme(min, np.min, f)
 
 	@staticmethod
 	def imax(*f):
-		return int(np.max(f))
+		"""The maximum of all the values as a Python int, like np.max; the arguments can be numbers, sequences, or arrays."""
+		return _int_extreme(max, np.max, f)
 
 	@staticmethod
-	def slice_bounded(arr: np.array, i: int, j: int) -> np.array:
-		if i < 0: i = len(arr) - i
-		if j < 0: j = len(arr) - j
-		start, stop = NumericTools.imax(0, i), NumericTools.imin(len(arr), j)
-		return arr[start : stop]
+	def slice_bounded(arr: np.array, i: Optional[int], j: Optional[int]) -> np.array:
+		"""
+		Slices `arr[i:j]`, clamping the bounds to the array.
+		Negative indices count from the end, as usual; None means the start or end.
+		"""
+		n = len(arr)
+		if i is None: i = 0
+		elif i < 0: i = max(0, n + i)
+		if j is None: j = n
+		elif j < 0: j = max(0, n + j)
+		return arr[i : min(n, j)]
 
 
 class PandasTools(VeryCommonTools):
@@ -7,9 +7,18 @@ from textwrap import wrap, indent
 from typing import SupportsBytes
 
 import contextlib
+from itertools import islice
+import io
+import re
 import subprocess
 import gzip
 import hashlib
+import math
+
+try:
+	import orjson
+except ImportError:
+	orjson = None
 
 try:
 	import jsonpickle
@@ -23,6 +32,21 @@ except ImportError:
 	logger.error("Could not import jsonpickle")
 
 
+def _has_non_finite(data: Any) -> bool:
+	"""Whether data contains a NaN or infinite float, looking inside dicts, lists, tuples, and arrays."""
+	if isinstance(data, (float, np.floating)):
+		return not math.isfinite(data)
+	if isinstance(data, dict):
+		return any(_has_non_finite(v) for v in data.values())
+	if isinstance(data, (list, tuple)):
+		return any(_has_non_finite(v) for v in data)
+	if isinstance(data, np.ndarray):
+		if data.dtype.kind in 'fc':
+			return not np.isfinite(data).all()
+		return data.dtype.kind == 'O' and any(_has_non_finite(v) for v in data.flat)
+	return False
+
+
 class ConsoleTools(VeryCommonTools):
 
 	CURSOR_UP_ONE = '\x1b[1A'
@@ -53,9 +77,23 @@ class ConsoleTools(VeryCommonTools):
 		This only works in a shell.
 		:param n: The number of lines to erase
 		"""
-		for _ in range(n):
-			sys.stdout.write(ConsoleTools.CURSOR_UP_ONE)
-			sys.stdout.write(ConsoleTools.ERASE_LINE)
+		sys.stdout.write((ConsoleTools.CURSOR_UP_ONE + ConsoleTools.ERASE_LINE) * n)
+		sys.stdout.flush()
+
+	@staticmethod
+	@contextmanager
+	def buffered_stdout() -> Iterator[None]:
+		"""
+		Collects everything written to stdout inside the block and writes it in a single call at the end.
+		Useful around loops that emit many small writes, such as control characters.
+		"""
+		buffer = io.StringIO()
+		try:
+			with contextlib.redirect_stdout(buffer):
+				yield
+		finally:
+			sys.stdout.write(buffer.getvalue())
+			sys.stdout.flush()
 
 
 class IoTools(VeryCommonTools):
@@ -181,19 +219,19 @@ ENCODING = 'utf8'
 class FilesysTools(VeryCommonTools):
 
 	@staticmethod
-	def updir(n: int, *parts) -> Path:
+	def updir(n: int, *parts, resolve: bool = False) -> Path:
 		"""
 		Get an absolute path `n` parents from `os.getcwd()`.
 		Ex: In dir '/home/john/dir_a/dir_b':
 			`updir(2, 'dir1', 'dir2')  # returns Path('/home/john/dir1/dir2')`
 		Does not sanitize.
+		:param resolve: Also follow symlinks, which costs filesystem calls; otherwise normalizes the path lexically
 		"""
 		base = Path(os.getcwd())
 		for _ in range(n):
 			base = base.parent
-		for part in parts:
-			base = base / part
-		return base.resolve()
+		base = base.joinpath(*parts)
+		return base.resolve() if resolve else Path(os.path.normpath(str(base)))
 
 	@staticmethod
 	def try_cleanup(path: Path) -> None:
@@ -214,9 +252,9 @@ class FilesysTools(VeryCommonTools):
 		"""
 		lines = []
 		with FilesysTools.open_file(path, 'r') as f:
-			for line in f.readlines():
+			for line in f:
 				line = line.strip()
-				if not ignore_comments or not line.startswith('#') and not len(line.strip()) == 0:
+				if not ignore_comments or (len(line) > 0 and not line.startswith('#')):
 					lines.append(line)
 		return lines
 
@@ -231,12 +269,12 @@ class FilesysTools(VeryCommonTools):
 		"""
 		dct = {}
 		with FilesysTools.open_file(path, 'r') as f:
-			for i, line in enumerate(f.readlines()):
+			for i, line in enumerate(f):
 				line = line.strip()
 				if len(line) == 0 or line.startswith('#'): continue
-				if line.count('=') != 1:
+				k, sep, v = line.partition('=')
+				if not sep or '=' in v:
 					raise ParsingError("Bad line {} in {}".format(i, path))
-				k, v = line.split('=')
 				if k.strip() in dct:
 					raise ParsingError("Duplicate property {} (line {})".format(k.strip(), i))
 				dct[k.strip()] = v.strip()
@@ -270,13 +308,32 @@ class FilesysTools(VeryCommonTools):
 
 	@staticmethod
 	def save_json(data, path: PLike, mode: str = 'w') -> None:
+		"""
+		Writes compact JSON using orjson if it's installed, falling back to json (and JsonEncoder) for anything orjson can't serialize.
+		orjson would write NaN and infinity as null, so data containing them is written by json, as NaN and Infinity.
+		Both write the same compact format, with no spaces after separators.
+		"""
+		encoded = None
+		if orjson is not None and not _has_non_finite(data):
+			try:
+				encoded = orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS).decode('utf8')
+			except orjson.JSONEncodeError:
+				pass
+		if encoded is None:
+			encoded = json.dumps(data, ensure_ascii=False, cls=JsonEncoder, separators=(',', ':'))
 		with FilesysTools.open_file(path, mode) as f:
-			json.dump(data, f, ensure_ascii=False, cls=JsonEncoder)
+			f.write(encoded)
 
 	@staticmethod
 	def load_json(path: PLike):
-		with FilesysTools.open_file(path, 'r') as f:
-			return json.load(f)
+		"""Reads JSON using orjson if it's installed, falling back to json for what orjson rejects (such as NaN)."""
+		text = FilesysTools.read_text(path)
+		if orjson is not None:
+			try:
+				return orjson.loads(text)
+			except orjson.JSONDecodeError:
+				pass
+		return json.loads(text)
 
 	@staticmethod
 	def save_jsonpkl(data, path: PLike, mode: str = 'w') -> None:
@@ -369,11 +426,13 @@ class FilesysTools(VeryCommonTools):
 		if not mode.read:
 			FilesysTools.prep_file(path, overwrite=mode.overwrite, append=mode.append)
 		if mode.gzipped:
-			yield gzip.open(path, mode.internal, compresslevel=COMPRESS_LEVEL)
+			f = gzip.open(path, mode.internal, compresslevel=COMPRESS_LEVEL)
 		elif mode.binary:
-			yield open(path, mode.internal)
+			f = open(path, mode.internal)
 		else:
-			yield open(path, mode.internal, encoding=ENCODING)
+			f = open(path, mode.internal, encoding=ENCODING)
+		with f:
+			yield f
 
 	@staticmethod
 	def write_lines(iterable: Iterable[Any], path: PLike, mode: str = 'w') -> int:
@@ -394,25 +453,32 @@ class FilesysTools(VeryCommonTools):
 		FilesysTools.prep_file(path, mode.overwrite, mode.append)
 		n = 0
 		with FilesysTools.open_file(path, mode) as f:
-			for x in iterable:
-				f.write(str(x) + '\n')
-			n += 1
+			# write in blocks of lines rather than making a call per line
+			iterator = iter(iterable)
+			while True:
+				block = [str(x) for x in islice(iterator, 1024)]
+				if len(block) == 0: break
+				f.write('\n'.join(block) + '\n')
+				n += len(block)
 		return n
 
 	@staticmethod
 	def sha1(x: SupportsBytes) -> str:
-		return FilesysTools.hash_hex(x, hashlib.sha1)
+		return hashlib.sha1(bytes(x)).hexdigest()
 
 	@staticmethod
 	def sha256(x: SupportsBytes) -> str:
-		return FilesysTools.hash_hex(x, hashlib.sha256)
+		return hashlib.sha256(bytes(x)).hexdigest()
 
 	@staticmethod
-	def hash_hex(x: SupportsBytes, algorithm: str) -> str:
-		"""Return the hex-encoded hash of the object (converted to bytes)."""
-		m = hashlib.new(algorithm)
-		m.update(bytes(x))
-		return m.hexdigest()
+	def hash_hex(x: SupportsBytes, algorithm: Union[str, Callable[..., Any]]) -> str:
+		"""
+		Return the hex-encoded hash of the object (converted to bytes).
+		:param algorithm: A hashlib constructor like hashlib.sha1, or a name for hashlib.new
+		"""
+		if isinstance(algorithm, str):
+			return hashlib.new(algorithm, bytes(x)).hexdigest()
+		return algorithm(bytes(x)).hexdigest()
 
 	@staticmethod
 	def sanitize_file_path(path: PLike, show_warnings: bool = True) -> Path:
@@ -36,18 +36,18 @@ class TimingTools:
 		"""
 		is_neg = ms < 0
 		ms = abs(int(ms))
-		seconds = int((ms/1000) % 60)
-		minutes = int((ms/(1000*60)) % 60)
-		hours = int((ms/(1000*60*60)) % 24)
-		days = int(ms/(1000*60*60*24))
+		total_seconds = ms // 1000
+		total_minutes, seconds = divmod(total_seconds, 60)
+		total_hours, minutes = divmod(total_minutes, 60)
+		days, hours = divmod(total_hours, 24)
 		if ms < 1000:
 			s = "{}ms".format(ms)
-		elif days > 1:
-			s = "{}d:{}:{}:{}".format(days, str(hours).zfill(2), str(minutes).zfill(2), str(seconds).zfill(2))
-		elif hours > 1:
-			s = "{}:{}:{}".format(str(hours).zfill(2), str(minutes).zfill(2), str(seconds).zfill(2))
+		elif days >= 1:
+			s = "{}d:{:02d}:{:02d}:{:02d}".format(days, hours, minutes, seconds)
+		elif hours >= 1:
+			s = "{:02d}:{:02d}:{:02d}".format(hours, minutes, seconds)
 		else:
-			s = "{}:{}".format(str(minutes).zfill(2), str(seconds).zfill(2))
+			s = "{:02d}:{:02d}".format(minutes, seconds)
 		return '−' + s if is_neg else s
 
 	@staticmethod
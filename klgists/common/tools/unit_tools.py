@@ -3,6 +3,33 @@ from typing import SupportsFloat
 
 import humanfriendly as friendly
 import math
+import re
+import functools
+
+# note the lazy ops in the first group and in the non-(alphanumeric/dot/dash) separator between the drug and dose
+_drug_dose_pattern = re.compile(r'^\s*(.*?)(?:[^A-Za-z0-9.\-]+?[\s(\[{]*(\d+(?:\.\d*)?)\s*([mµunp]M)\s*[)\]}]*)?\s*$')
+# we need to make sure mM ex isn't part of a larger name
+_embedded_dose_pattern = re.compile(r'[^A-Za-z0-9.\-](\d+(?:\.\d*)?)[\s(\[{]*([mµunp]M)[^A-Za-z0-9]')
+_lone_dose_pattern = re.compile(r'^(\d+(?:\.\d*)?)[\s(\[{]*([mµunp]M)$')
+# powers of 10 from each unit to micromolar; dividing for the negative ones avoids errors like 5 * 1E-6 = 4.9999999999999996e-06
+_micromolar_exponents = {
+	'M': 6,
+	'mM': 3,
+	'µM': 0,
+	'uM': 0,
+	'nM': -3,
+	'pM': -6,
+	'fM': -9
+}
+
+
+@functools.lru_cache(maxsize=4096)
+def _round_to_sigfigs(num: float, sig_figs: int) -> float:
+	# tables of doses repeat the same few values, so caching skips the log10 for most calls
+	if num != 0:
+		return round(num, sig_figs - 1 - math.floor(math.log10(abs(num))))
+	else:
+		return 0  # can't take the log of 0
 
 
 class UnitTools:
@@ -26,11 +53,7 @@ class UnitTools:
 		"""
 		if sig_figs < 0:
 			raise ValueError("sig_figs {} is negative".format(sig_figs))
-		num = float(num)
-		if num != 0:
-			return round(num, -int(math.floor(math.log10(abs(num))) - (sig_figs - 1)))
-		else:
-			return 0  # can't take the log of 0
+		return _round_to_sigfigs(float(num), sig_figs)
 
 	@staticmethod
 	def nice_dose(micromolar_dose: float, n_sigfigs: Optional[int] = 5, adjust_units: bool = True, use_sigfigs: bool = True) -> str:
@@ -86,9 +109,7 @@ class UnitTools:
 			- The drug and dose must be separated by at least one non-alphanumeric, non-dot, non-hyphen character.
 			- Units must follow the digits, separated by at most whitespace, and are case-sensitive.
 		"""
-		# note the lazy ops in the first group and in the non-(alphanumeric/dot/dash) separator between the drug and dose
-		pat = re.compile(r'^\s*(.*?)(?:[^A-Za-z0-9.\-]+?[\s(\[{]*(\d+(?:.\d*)?)\s*([mµunp]M)\s*[)\]}]*)?\s*$')
-		match = pat.fullmatch(text)
+		match = _drug_dose_pattern.fullmatch(text)
 		if match is None:
 			raise ValueError("The text {} couldn't be parsed".format(text))
 		if match.group(2) is None:
@@ -106,17 +127,14 @@ class UnitTools:
 		If no matches are found, returns None.
 		If multiple matches are found, warns and returns None.
 		"""
-		# we need to make sure mM ex isn't part of a larger name
-		pat1 = re.compile(r'[^A-Za-z0-9.\-](\d+(?:.\d*))[\s(\[{]*([mµunp]M)[^A-Za-z0-9]')
-		pat2 = re.compile(r'^(\d+(?:\.\d*)?)[\s(\[{]*([mµunp]M)$')
 		def find(pat):
 			return {
 				UnitTools.dose_to_micromolar(float(match.group(1)), match.group(2))
 				for match in pat.finditer(text)
 				if match is not None
 			}
-		matches = find(pat1)
-		matches.update(find(pat2))
+		matches = find(_embedded_dose_pattern)
+		matches.update(find(_lone_dose_pattern))
 		if len(matches) == 1:
 			return next(iter(matches))
 		elif len(matches) > 1:
@@ -128,13 +146,10 @@ class UnitTools:
 		"""
 		Ex: dose_to_micromolar(53, 'nM')  # returns 0.053
 		"""
-		return float(digits) *{
-			'mM': 1000,
-			'µM': 1.0,
-			'uM': 1.0,
-			'nM': 1/1000,
-			'pM': 1/1000
-		}[units]
+		exponent = _micromolar_exponents.get(units)
+		if exponent is None:
+			raise KeyError("Unknown units {}".format(units))
+		return float(digits) * 10**exponent if exponent >= 0 else float(digits) / 10**-exponent
 
 
 __all__ = ['UnitTools']
\ No newline at end of file
@@ -1,6 +1,9 @@
-import pymysql
+from __future__ import annotations
 import contextlib
-from typing import Tuple, List, Dict, Iterator
+from typing import Tuple, List, Dict, Iterator, TYPE_CHECKING
+
+if TYPE_CHECKING:
+	import pymysql
 
 select = None
 execute = None
@@ -1,8 +1,248 @@
-import os, json, logging
-from typing import Tuple, Iterator, Dict, Optional, Union
+from __future__ import annotations
+import os, json, logging, threading, time
+from contextlib import contextmanager
+from itertools import islice
+from typing import Tuple, Iterator, Iterable, Dict, Optional, Union, Callable, List, Any, TYPE_CHECKING
 
-import pymysql
-import peewee
+# pymysql and peewee are imported where they're first needed, so importing this module stays cheap
+if TYPE_CHECKING:
+	import pymysql
+
+# idle time after which a pooled connection is pinged (and reconnected if needed) before it's reused
+_ping_after_idle_seconds = 30.0
+
+
+class _ConnectionPool:
+	"""
+	A small thread-safe pool of pymysql connections.
+	Connections are borrowed for a single statement and returned afterward,
+	so concurrent threads don't share (and corrupt) one socket or pay for a new handshake per query.
+	At most `max_size` connections are open at once; a borrower waits for one to be returned when they're all in use.
+	"""
+
+	def __init__(
+			self, factory: Callable[[], pymysql.connections.Connection], size: int, max_size: int,
+			ping_after_seconds: float = _ping_after_idle_seconds
+	):
+		if size < 0 or max_size < max(1, size):
+			raise ValueError("Invalid pool sizes {} and {}".format(size, max_size))
+		self._factory = factory
+		self._max_size = max_size
+		self._ping_after_seconds = ping_after_seconds
+		self._idle = []  # type: List[Tuple[pymysql.connections.Connection, float]]  # (connection, when it was returned)
+		self._n_open = 0
+		self._available = threading.Condition(threading.Lock())
+		for _ in range(size):
+			self._idle.append((factory(), time.monotonic()))
+			self._n_open += 1
+
+	@contextmanager
+	def borrow(self) -> Iterator[pymysql.connections.Connection]:
+		conn = self._get()
+		try:
+			yield conn
+		except BaseException:
+			self._release(conn, rollback=True)
+			raise
+		self._release(conn)
+
+	def reserve(self) -> pymysql.connections.Connection:
+		"""Takes a connection out of the pool for good; the caller must close it."""
+		return self._get()
+
+	def close(self) -> None:
+		with self._available:
+			idle, self._idle = self._idle, []
+			self._n_open -= len(idle)
+			self._available.notify_all()
+		for conn, _ in idle:
+			conn.close()
+
+	def _get(self) -> pymysql.connections.Connection:
+		with self._available:
+			while len(self._idle) == 0 and self._n_open >= self._max_size:
+				self._available.wait()
+			if len(self._idle) > 0:
+				conn, returned_at = self._idle.pop()
+			else:
+				conn, returned_at = None, None
+				self._n_open += 1  # claim the slot now, but connect outside the lock
+		if conn is None:
+			try:
+				return self._factory()
+			except BaseException:
+				self._discard()
+				raise
+		# the server may have dropped a connection that sat idle, but checking costs a round trip
+		if time.monotonic() - returned_at > self._ping_after_seconds:
+			try:
+				conn.ping(reconnect=True)
+			except BaseException:
+				_close_quietly(conn)
+				self._discard()
+				raise
+		return conn
+
+	def _release(self, conn: pymysql.connections.Connection, rollback: bool = False) -> None:
+		if rollback:
+			# don't hand the next borrower a half-finished transaction
+			try:
+				conn.rollback()
+			except Exception:
+				# the connection is probably broken, so replace it instead of returning it
+				_close_quietly(conn)
+				self._discard()
+				return
+		with self._available:
+			self._idle.append((conn, time.monotonic()))
+			self._available.notify()
+
+	def _discard(self) -> None:
+		"""Gives up the slot of a connection that failed to open or was closed, waking a borrower waiting for one."""
+		with self._available:
+			self._n_open -= 1
+			self._available.notify()
+
+
+def _close_quietly(conn: pymysql.connections.Connection) -> None:
+	try:
+		conn.close()
+	except Exception: pass
+
+
+class _WriteBuffer:
+	"""
+	Collects rows per statement and writes each statement's rows with a single executemany and commit.
+	Flushes once `batch_size` rows are waiting, or `flush_seconds` after the first row was added.
+	This trades durability for throughput: rows still in the buffer are lost if the process dies.
+	Rows that fail to be written stay in the buffer to be retried by the next flush.
+	If a timed flush fails, its error is raised by the next `add`; `flush` retries and raises only if it fails again.
+	"""
+
+	def __init__(self, write: Callable[[str, List[Tuple]], None], batch_size: int, flush_seconds: Optional[float]):
+		self._write = write
+		self._batch_size = batch_size
+		self._flush_seconds = flush_seconds
+		self._rows = {}  # type: Dict[str, List[Tuple]]
+		self._n_rows = 0
+		self._timer = None
+		self._error = None  # type: Optional[Exception]
+		self._lock = threading.RLock()
+
+	def add(self, statement: str, vals: Tuple) -> None:
+		with self._lock:
+			if self._error is not None:
+				error, self._error = self._error, None
+				raise error
+			self._rows.setdefault(statement, []).append(vals)
+			self._n_rows += 1
+			if self._n_rows >= self._batch_size:
+				self.flush()
+			elif self._timer is None and self._flush_seconds is not None:
+				self._timer = threading.Timer(self._flush_seconds, self._timed_flush)
+				self._timer.daemon = True
+				self._timer.start()
+
+	def flush(self) -> None:
+		with self._lock:
+			if self._timer is not None:
+				self._timer.cancel()
+				self._timer = None
+			self._error = None
+			batches = list(self._rows.items())
+			self._rows, self._n_rows = {}, 0
+			for i, (statement, vals) in enumerate(batches):
+				try:
+					self._write(statement, vals)
+				except BaseException:
+					# keep this batch and the ones after it; nothing else can have been added while we hold the lock
+					self._rows = dict(batches[i:])
+					self._n_rows = sum(len(v) for _, v in batches[i:])
+					raise
+
+	def _timed_flush(self) -> None:
+		# runs on the timer's thread, where nobody would see the error, so keep it for the next add
+		try:
+			self.flush()
+		except Exception as e:
+			with self._lock:
+				self._error = e
+
+
+class _SharedTunnels:
+	"""
+	Reference-counted SSH tunnels shared by every Connection to the same host, port, user, and database port.
+	Like SSH's ControlPersist, a tunnel can linger for a while after its last user closes it,
+	so a later Connection can reuse it instead of repeating the SSH handshake.
+	"""
+
+	def __init__(self):
+		self._tunnels = {}  # type: Dict[Tuple[Any, ...], List[Any]]  # key -> [tunnel, n_users, close timer]
+		self._lock = threading.Lock()
+
+	def acquire(self, key: Tuple[Any, ...], factory: Callable[[], Any]):
+		with self._lock:
+			tunnel = self._reuse(key)
+			if tunnel is not None: return tunnel
+		# start outside the lock so a slow handshake doesn't block Connections to other hosts
+		tunnel = factory()
+		tunnel.start()
+		with self._lock:
+			existing = self._reuse(key)
+			if existing is None:
+				self._tunnels[key] = [tunnel, 1, None]
+				logging.info("Opened SSH tunnel to host %s on port %s", key[0], key[1])
+				return tunnel
+		# another thread opened one while we were starting ours
+		tunnel.close()
+		return existing
+
+	def _reuse(self, key: Tuple[Any, ...]):
+		# must hold the lock
+		entry = self._tunnels.get(key)
+		if entry is None or not entry[0].is_active:
+			return None
+		if entry[2] is not None:
+			entry[2].cancel()
+			entry[2] = None
+		entry[1] += 1
+		logging.info("Reusing SSH tunnel to host %s on port %s", key[0], key[1])
+		return entry[0]
+
+	def release(self, key: Tuple[Any, ...], linger_seconds: float) -> None:
+		with self._lock:
+			entry = self._tunnels.get(key)
+			if entry is None: return
+			entry[1] -= 1
+			if entry[1] > 0: return
+			if linger_seconds <= 0:
+				del self._tunnels[key]
+			else:
+				timer = threading.Timer(linger_seconds, self._expire, args=(key,))
+				timer.daemon = True  # don't keep the interpreter alive just to close the tunnel
+				entry[2] = timer
+				timer.start()
+				return
+		entry[0].close()
+		logging.info("Closed SSH tunnel to host %s on port %s", key[0], key[1])
+
+	def _expire(self, key: Tuple[Any, ...]) -> None:
+		with self._lock:
+			entry = self._tunnels.get(key)
+			# the timer might have been replaced or the tunnel reacquired in the meantime
+			if entry is None or entry[1] > 0 or entry[2] is not threading.current_thread():
+				return
+			del self._tunnels[key]
+		entry[0].close()
+		logging.info("Closed SSH tunnel to host %s on port %s", key[0], key[1])
+
+
+_shared_tunnels = _SharedTunnels()
+
+# parsed JSON configs, keyed by (real path, mtime in ns, size) so edited files are re-read
+_config_cache = {}  # type: Dict[Tuple[str, int, int], Dict[str, Union[str, int, None]]]
+_config_cache_lock = threading.Lock()
+_max_cached_configs = 32
 
 
 class Connection:
@@ -18,6 +258,8 @@ class Connection:
 		with Connection.from_json('a_json_file'):
 			...
 	The JSON file will need to specify a value for each argument in the constructor.
+	Tunnels created from an SSH hostname are shared with other Connections to the same host in this process,
+	and are closed when the last one closes, or kept open for `ssh_linger_seconds` afterward if it's positive.
 	"""
 
 
@@ -27,7 +269,14 @@ class Connection:
 			ssh_host: Optional[str] = None,
 			local_bind_port: Optional[int] = None,
 			ssh_port: int = 22,
-			db_port: int = 3306
+			db_port: int = 3306,
+			pool_size: int = 1,
+			max_pool_size: int = 8,
+			ssh_linger_seconds: float = 0,
+			write_batch_size: int = 1000,
+			write_flush_seconds: Optional[float] = 5.0,
+			peewee_max_connections: int = 16,
+			peewee_stale_timeout: Optional[float] = 300
 	):
 		self._ssh_username = None
 		self._ssh_password = None
@@ -39,7 +288,17 @@ class Connection:
 		self._local_bind_port = None
 		self._db_port = None
 		self._tunnel = None
-		self.plain_sql_database = None
+		self._tunnel_factory = None
+		self._ssh_linger_seconds = ssh_linger_seconds
+		self._pool = None
+		self._plain_sql_database = None
+		self._pool_size = pool_size
+		self._max_pool_size = max_pool_size
+		self._write_buffer = None
+		self._write_batch_size = write_batch_size
+		self._write_flush_seconds = write_flush_seconds
+		self._peewee_max_connections = peewee_max_connections
+		self._peewee_stale_timeout = peewee_stale_timeout
 		self.peewee_database = None
 		if (ssh_host is None) == (local_bind_port is None):
 			raise ValueError("Must specify either an SSH host to create a tunnel, or the local bind port of an existing tunnel (but not both)")
@@ -56,53 +315,154 @@ class Connection:
 			except:
 				logging.error("Couldn't import sshtunnel. Cannot make new tunnel.")
 				raise
-			self._tunnel = SSHTunnelForwarder(
+			self._tunnel_factory = lambda: SSHTunnelForwarder(
 				(self._ssh_host, self._ssh_port),
 				ssh_username=self._ssh_username, ssh_password=self._ssh_password,
-				remote_bind_address=('localhost', self._db_port)
+				remote_bind_address=('localhost', self._db_port),
+				set_keepalive=30.0
 			)
 
 	@classmethod
 	def from_json(cls, config_path: str):
+		"""
+		Builds a Connection from the arguments in a JSON file.
+		The parsed file is cached until it changes, so calling this repeatedly doesn't re-read it.
+		"""
 		if os.path.isfile(config_path) and os.access(config_path, os.R_OK):
-			logging.info("Using Valar connection from '{}'".format(config_path))
-			with open(config_path) as jscfg:
-				params = json.load(jscfg)  # type: Dict[str, Union[str, int, None]]
-				return cls(**params)
+			logging.info("Using Valar connection from '%s'", config_path)
+			return cls(**Connection._load_config(config_path))
 		else:
 			raise ValueError("{} does not exist, is not a file, or is not readable".format(config_path))
 
+	@staticmethod
+	def _load_config(config_path: str) -> Dict[str, Union[str, int, None]]:
+		path = os.path.realpath(config_path)
+		st = os.stat(path)
+		key = (path, st.st_mtime_ns, st.st_size)
+		with _config_cache_lock:
+			params = _config_cache.get(key)
+		if params is None:
+			with open(path) as jscfg:
+				params = json.load(jscfg)  # type: Dict[str, Union[str, int, None]]
+			with _config_cache_lock:
+				# drop stale entries for this file, then the oldest if we're still full
+				for k in [k for k in _config_cache if k[0] == path]:
+					del _config_cache[k]
+				if len(_config_cache) >= _max_cached_configs:
+					del _config_cache[next(iter(_config_cache))]
+				_config_cache[key] = params
+		return dict(params)
+
 	@classmethod
 	def from_dict(cls, dct: Dict[str, str]):
 		return cls(**dct)
 
 	def connect_with_peewee(self):
-		self.peewee_database = peewee.MySQLDatabase(self._db_name, **self._connection_params())
+		"""
+		Opens a pooled peewee database.
+		Each thread gets a connection from the pool (up to `peewee_max_connections`) instead of a new handshake,
+		and connections idle for longer than `peewee_stale_timeout` seconds are recycled.
+		"""
+		from playhouse.pool import PooledMySQLDatabase
+		self.peewee_database = PooledMySQLDatabase(
+			self._db_name,
+			max_connections=self._peewee_max_connections, stale_timeout=self._peewee_stale_timeout,
+			**self._connection_params()
+		)
 		self.peewee_database.connect()
 		return self.peewee_database
 
 	def connect_with_plain_sql(self):
-		self.plain_sql_database = pymysql.connect(**self._connection_params(), db=self._db_name, cursorclass=pymysql.cursors.DictCursor)
-		logging.debug("Opened raw pymysql connection to database {}".format(self._db_name))
+		"""
+		Opens a pool of raw pymysql connections.
+		`execute` and `select` each borrow a connection from it, so they're safe to call from multiple threads.
+		"""
+		import pymysql
+		params = self._connection_params()
+		self._pool = _ConnectionPool(
+			lambda: pymysql.connect(**params, db=self._db_name, cursorclass=pymysql.cursors.DictCursor),
+			self._pool_size, self._max_pool_size
+		)
+		logging.debug("Opened raw pymysql connection pool to database %s", self._db_name)
+
+	@property
+	def plain_sql_database(self) -> Optional[pymysql.connections.Connection]:
+		"""
+		A single raw connection, kept for code written before the pool existed; None until `connect_with_plain_sql`.
+		It's taken out of the pool and is not safe to share between threads. Prefer `execute` and `select`.
+		"""
+		if self._pool is None:
+			return None
+		if self._plain_sql_database is None:
+			self._plain_sql_database = self._pool.reserve()
+		return self._plain_sql_database
 
 	def execute(self, statement: str, vals: Tuple = ()) -> None:
-		with self.plain_sql_database.cursor() as cursor:
-			cursor.execute(statement, vals)
-			self.plain_sql_database.commit()
+		with self._pool.borrow() as conn:
+			with conn.cursor() as cursor:
+				cursor.execute(statement, vals)
+				conn.commit()
 
-	def select(self, statement: str, vals: Tuple = ()) -> Iterator[Dict]:
-		with self.plain_sql_database.cursor() as cursor:
-			cursor.execute(statement, vals)
-			return cursor
+	def execute_many(self, statement: str, rows: Iterable[Tuple], batch_size: int = 1000) -> int:
+		"""
+		Executes `statement` once per row in `rows`, sending `batch_size` rows per executemany and committing once per batch.
+		Much faster than calling `execute` per row, which pays a round trip and a commit for each.
+		:return: The number of rows executed
+		"""
+		n_rows = 0
+		rows = iter(rows)
+		while True:
+			batch = list(islice(rows, batch_size))
+			if len(batch) == 0:
+				return n_rows
+			self._execute_batch(statement, batch)
+			n_rows += len(batch)
+
+	def buffered_execute(self, statement: str, vals: Tuple = ()) -> None:
+		"""
+		Like `execute`, but buffers the row and later writes it together with others for the same statement.
+		The buffer is written once `write_batch_size` rows are waiting, `write_flush_seconds` after the first row was added,
+		or when `flush` or `close` is called.
+		WARNING: Buffered rows are not durable; they're lost if the process dies before they're written.
+		"""
+		if self._write_buffer is None:
+			self._write_buffer = _WriteBuffer(self._execute_batch, self._write_batch_size, self._write_flush_seconds)
+		self._write_buffer.add(statement, vals)
+
+	def flush(self) -> None:
+		"""Writes any rows waiting from `buffered_execute`."""
+		if self._write_buffer is not None:
+			self._write_buffer.flush()
+
+	def _execute_batch(self, statement: str, rows: List[Tuple]) -> None:
+		with self._pool.borrow() as conn:
+			with conn.cursor() as cursor:
+				cursor.executemany(statement, rows)
+				conn.commit()
+
+	def select(self, statement: str, vals: Tuple = (), chunk_size: int = 1024) -> Iterator[Dict]:
+		"""
+		Streams the rows of a query as dicts, fetching `chunk_size` rows at a time through a server-side cursor.
+		The result set is never held in memory all at once.
+		The pooled connection stays borrowed until the generator is exhausted or closed.
+		:return: A generator of rows; unlike earlier versions, not a cursor
+		"""
+		from pymysql.cursors import SSDictCursor
+		with self._pool.borrow() as conn:
+			with conn.cursor(SSDictCursor) as cursor:
+				cursor.execute(statement, vals)
+				while True:
+					rows = cursor.fetchmany(chunk_size)
+					if not rows: break
+					yield from rows
 
 	def __enter__(self):
 		self.open()
 		return self
 
 	def open(self):
-		if self._tunnel is not None:
-			self._tunnel.start()
-			logging.info("Opened SSH tunnel to host {} on port {}".format(self._ssh_host, self._ssh_port))
+		if self._tunnel_factory is not None:
+			self._tunnel = _shared_tunnels.acquire(self._tunnel_key(), self._tunnel_factory)
 		else:
 			logging.info("Assuming an SSH tunnel already exists for database connection.")
 
@@ -110,15 +470,25 @@ class Connection:
 		self.close()
 
 	def close(self):
+		if self._write_buffer is not None:
+			self._write_buffer.flush()
+			self._write_buffer = None
 		if self._tunnel is not None:
-			self._tunnel.close()
-			logging.info("Closed SSH tunnel")
-		if self.plain_sql_database is not None:
-			self.plain_sql_database.close()
-			logging.info("Closed raw pymysql connection")
+			_shared_tunnels.release(self._tunnel_key(), self._ssh_linger_seconds)
+			self._tunnel = None
+		if self._plain_sql_database is not None:
+			self._plain_sql_database.close()
+			self._plain_sql_database = None
+		if self._pool is not None:
+			self._pool.close()
+			logging.info("Closed raw pymysql connection pool")
 		if self.peewee_database is not None:
-			logging.info("Closed peewee pymysql connection")
 			self.peewee_database.close()
+			self.peewee_database.close_all()
+			logging.info("Closed peewee pymysql connection pool")
+
+	def _tunnel_key(self) -> Tuple[Any, ...]:
+		return self._ssh_host, self._ssh_port, self._ssh_username, self._db_port
 
 	def _connection_params(self):
 		local_bind_port = self._tunnel.local_bind_port if self._tunnel is not None else self._local_bind_port
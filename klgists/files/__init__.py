@@ -1,7 +1,7 @@
 from pathlib import Path
-import os, io, shutil, gzip, platform, re
+import os, io, shutil, gzip, platform, re, mmap, tempfile
 from enum import Enum
-from typing import Iterator, Iterable, Mapping
+from typing import Iterator, Iterable, Mapping, Tuple
 
 import dill
 
@@ -114,11 +114,54 @@ def remake_dirs(output_dir: str):
 	make_dirs(output_dir)
 
 def replace_in_file(path: str, changes: Mapping[str, str]) -> None:
-	"""Uses re.sub repeatedly to modify (AND REPLACE) a file's content."""
-	with open(path) as f: data = f.read()
+	"""
+	Uses re.sub repeatedly to modify (AND REPLACE) a file's content.
+	The changes are applied in order, each to the result of the last, with MULTILINE and DOTALL.
+	If every change is plain text with the same encoded length as its replacement, and the file has only \n newlines,
+	the file is patched in place; otherwise it's rewritten in text mode (normalizing newlines) and replaced atomically.
+	"""
+	if len(changes) > 0 and all(_is_same_length_literal(key, value) for key, value in changes.items()):
+		if _patch_in_place(path, [(key.encode('utf8'), value.encode('utf8')) for key, value in changes.items()]):
+			return
+	with open(path, encoding="utf8") as f: data = f.read()
 	for key, value in changes.items():
-		data = re.sub(key, value, data, re.MULTILINE, re.DOTALL)
-	with open(path, 'w', encoding="utf8") as f: f.write(data)
+		data = re.sub(key, value, data, flags=re.MULTILINE | re.DOTALL)
+	path = os.fspath(path)
+	tmp = tempfile.NamedTemporaryFile('w', encoding="utf8", dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp', delete=False)
+	try:
+		with tmp: tmp.write(data)
+		shutil.copymode(path, tmp.name)
+		os.replace(tmp.name, path)
+	except BaseException:
+		os.remove(tmp.name)
+		raise
+
+
+def _is_same_length_literal(key: str, value: str) -> bool:
+	# a key with no regex syntax and no newlines (which text mode would translate) matches exactly its bytes
+	return (
+		len(key) > 0 and re.escape(key) == key and '\\' not in value
+		and '\n' not in key and '\r' not in key
+		and len(key.encode('utf8')) == len(value.encode('utf8'))
+	)
+
+def _patch_in_place(path: str, changes: Iterable[Tuple[bytes, bytes]]) -> bool:
+	"""
+	Overwrites occurrences of each key with its same-length value, touching only the pages that change.
+	:return: False, without changing anything, if the file has \r newlines, which the text-mode rewrite would convert
+	"""
+	if os.path.getsize(path) == 0: return True  # can't map an empty file, and there's nothing to replace
+	with open(path, 'r+b') as f:
+		with mmap.mmap(f.fileno(), 0) as mm:
+			if mm.find(b'\r') >= 0:
+				return False
+			for key, value in changes:
+				i = mm.find(key)
+				while i >= 0:
+					mm[i : i + len(key)] = value
+					i = mm.find(key, i + len(key))
+			mm.flush()
+	return True
 
 
 def lines(file_name: str, known_encoding='utf-8') -> Iterator[str]:
@@ -1,25 +1,59 @@
-from typing import Callable, Any
+from typing import Callable, Any, Iterable, Optional, Dict
+from concurrent.futures import ThreadPoolExecutor
 import hashlib
 import os
+import mmap
 import codecs
 import gzip
 
 from klgists.common.exceptions import HashValidationFailedException
 
+_file_digest = getattr(hashlib, 'file_digest', None)
+
 
 class FileHasher:
 
-	def __init__(self, algorithm: Callable[[], Any]=hashlib.sha1, extension: str='.sha1', buffer_size: int = 16*1024):
+	def __init__(self, algorithm: Callable[[], Any]=hashlib.sha1, extension: str='.sha1', buffer_size: int = 1024*1024, mmap_threshold: int = 1024*1024):
+		"""
+		:param mmap_threshold: Files at least this many bytes are memory-mapped for hashing instead of read
+		"""
 		self.algorithm = algorithm
 		self.extension = extension
 		self.buffer_size = buffer_size
+		self.mmap_threshold = max(1, mmap_threshold)  # empty files can't be mapped
 
 	def hashsum(self, file_name: str) -> str:
-		alg = self.algorithm()
-		with open(file_name, 'rb') as f:
-			for chunk in iter(lambda: f.read(self.buffer_size), b''):
-				alg.update(chunk)
-		return alg.hexdigest()
+		with open(file_name, 'rb', buffering=0) as f:
+			if os.fstat(f.fileno()).st_size >= self.mmap_threshold:
+				# hash straight from the page cache, without copying the file into Python buffers
+				alg = self.algorithm()
+				with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+					if hasattr(mm, 'madvise'):
+						mm.madvise(mmap.MADV_SEQUENTIAL)
+					alg.update(mm)
+				return alg.hexdigest()
+			if _file_digest is not None:
+				# Python 3.11+: the read loop runs in C, into one reused buffer
+				return _file_digest(f, self.algorithm).hexdigest()
+			alg = self.algorithm()
+			buffer = bytearray(self.buffer_size)
+			view = memoryview(buffer)
+			while True:
+				n = f.readinto(buffer)
+				if not n: break
+				alg.update(view[:n])
+			return alg.hexdigest()
+
+	def hash_many(self, file_names: Iterable[str], n_workers: Optional[int] = None) -> Dict[str, str]:
+		"""
+		Hashes many files concurrently in threads; hashlib releases the GIL while hashing, so this scales across cores.
+		:param n_workers: The maximum number of threads; the default is the number of CPUs
+		:return: A dict mapping each file name to its hash
+		"""
+		file_names = list(file_names)
+		if n_workers is None: n_workers = os.cpu_count() or 1
+		with ThreadPoolExecutor(max_workers=max(1, min(n_workers, len(file_names)))) as pool:
+			return dict(zip(file_names, pool.map(self.hashsum, file_names)))
 
 	def add_hash(self, file_name: str) -> None:
 		with open(file_name + self.extension, 'w', encoding="utf8") as f:
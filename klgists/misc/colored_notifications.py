@@ -1,3 +1,4 @@
+import sys
 from typing import Iterable, Mapping, Callable, Optional
 from enum import Enum
 from colorama import Fore, Style
@@ -28,27 +29,35 @@ class ColorMessages:
 		:param log_fn: If set, additionally logs every message with this function
 		:param kwargs: Arguments 'top', 'bottom', 'sides', and 'line_length'
 		"""
-		_cmap = ColorMessages.DEFAULT_COLOR_MAP
-		_cmap.update(color_map)
-		assert set(_cmap.keys()) == set(NotificationLevel.__members__.keys()),\
+		_cmap = dict(ColorMessages.DEFAULT_COLOR_MAP)
+		if color_map is not None: _cmap.update(color_map)
+		assert set(_cmap.keys()) == set(NotificationLevel),\
 			"Color map {} must match levels {}".format(_cmap, NotificationLevel.__members__)
-		self._color_map, self._log_fn, self._kwargs = _cmap, log_fn, kwargs
+		self._color_map, self._log_fn = _cmap, log_fn
+		self._prefixes = {level: str(color) for level, color in _cmap.items()}
+		# the banner shape is fixed per instance, so the rules and padding width are built once here
+		line_length = kwargs.get('line_length', 100)
+		self._top_line = kwargs.get('top', '_') * line_length
+		self._bottom_line = kwargs.get('bottom', '_') * line_length
+		self._sides = kwargs.get('sides', '')
+		self._inner_width = line_length - 2 * len(self._sides)
 
 	def thin(self, level: NotificationLevel, *lines: str):
-		self._print(lines, self._color_map[level], **self._kwargs)
+		self._print(lines, self._prefixes[level])
 
 	def thick(self, level: NotificationLevel, *lines: str):
-		self._print(['\n', lines, '\n'], self._color_map[level], **self._kwargs)
-
-	def _print(self, lines: Iterable[str], color: int, top: str = '_', bottom: str = '_', sides: str = '', line_length: int = 100):
-		def cl(text: str): print(str(color) + sides + text.center(line_length - 2 * len(sides)) + sides)
-		print(str(color) + top * line_length)
-		self._log(top * line_length)
-		for line in lines:
-			self._log(line)
-			cl(line)
-		print(str(color) + bottom * line_length)
-		self._log(bottom * line_length)
+		self._print(['', *lines, ''], self._prefixes[level])
+
+	def _print(self, lines: Iterable[str], prefix: str):
+		lines = list(lines)
+		sides = self._sides
+		# build the whole block first so it goes out in one write instead of one print per line
+		parts = [prefix + self._top_line + '\n']
+		parts.extend(prefix + sides + line.center(self._inner_width) + sides + '\n' for line in lines)
+		parts.append(prefix + self._bottom_line + '\n')
+		sys.stdout.write(''.join(parts))
+		sys.stdout.flush()
+		self._log('\n'.join([self._top_line, *lines, self._bottom_line]))
 
 	def _log(self, message):
 		if self._log_fn:
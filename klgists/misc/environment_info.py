@@ -1,5 +1,6 @@
 import os
 import sys
+import functools
 import getpass
 import platform
 import psutil
@@ -12,19 +13,27 @@ from klgists.misc.git import GitTools
 # TODO 'cpu': cpuinfo.get_cpu_info()['brand'],
 # unfortunately on Windows this causes a new Python interpreter to be launched
 
-def find_environment_info(extras: Optional[Dict[str, Any]]=None) -> Dict[str, str]:
-	"""Get a dictionary of some system and environment information."""
-	if extras is None: extras = {}
-	mains = {
+@functools.lru_cache(maxsize=1)
+def _static_environment_info() -> Dict[str, str]:
+	"""The parts that can't change while the process runs; platform.platform() in particular is slow."""
+	return {
 			'os_release': platform.platform(),
 			'hostname': socket.gethostname(),
 			'username': getpass.getuser(),
 			'python_version': sys.version,
-			'shell': os.environ['SHELL'],
-			'disk_used': psutil.disk_usage('.').used,
-			'disk_free': psutil.disk_usage('.').free,
-			'memory_used': psutil.virtual_memory().used,
-			'memory_available': psutil.virtual_memory().available,
+			'shell': os.environ.get('SHELL', '')  # not set on Windows
+	}
+
+def find_environment_info(extras: Optional[Dict[str, Any]]=None) -> Dict[str, str]:
+	"""Get a dictionary of some system and environment information."""
+	if extras is None: extras = {}
+	disk, memory = psutil.disk_usage('.'), psutil.virtual_memory()
+	mains = {
+			**_static_environment_info(),
+			'disk_used': disk.used,
+			'disk_free': disk.free,
+			'memory_used': memory.used,
+			'memory_available': memory.available,
 			'sauronx_hash': GitTools.commit_hash(),
 			'environment_info_capture_datetime': datetime.now().isoformat()
 	}
@@ -1,7 +1,13 @@
+import os
 import re
+import functools
+from typing import Optional, Tuple, Any
 from klgists.common.exceptions import ExternalCommandFailed, ParsingFailedException
 from klgists.common import abcd
 
+# ex: 1.8.6-43-g0ceb89d3a954da84070858319f177abe3869752b-dirty
+_git_describe_pattern = re.compile(r'([\d.]+)-(\d+)-g([0-9a-f]{40})(?:-([a-z]+))?')
+
 
 @abcd.dataclass(frozen=True)
 class GitDescription:
@@ -14,9 +20,7 @@ class GitDescription:
 
 	@staticmethod
 	def parse(text: str):
-		pat = re.compile('''([\d.]+)-(\d+)-g([0-9a-h]{40})(?:-([a-z]+))?''')
-		# ex: 1.8.6-43-g0ceb89d3a954da84070858319f177abe3869752b-dirty
-		m = pat.fullmatch(text)
+		m = _git_describe_pattern.fullmatch(text)
 		if m is None: raise ParsingFailedException("Bad git describe string {}".format(text))
 		# noinspection PyArgumentList
 		return GitDescription(text, m.group(1), int(m.group(2)), m.group(3), m.group(4)=='dirty', m.group(4)=='broken')
@@ -30,8 +34,14 @@ class GitTools:
 
 	@staticmethod
 	def commit_hash(git_repo_dir: str = '.') -> str:
-		"""Gets the hex of the most recent Git commit hash in git_repo_dir."""
-		return GitTools.description(git_repo_dir).hash
+		"""
+		Gets the hex of the most recent Git commit hash in git_repo_dir.
+		The result is cached until HEAD or the branch it points to changes, so repeated calls don't run git.
+		"""
+		state = _git_head_state(git_repo_dir)
+		if state is None:
+			return GitTools.description(git_repo_dir).hash
+		return _commit_hash_at(state, git_repo_dir)
 
 	@staticmethod
 	def description(git_repo_dir: str = '.') -> GitDescription:
@@ -43,4 +53,37 @@ class GitTools:
 		return GitDescription.parse(out.decode('utf-8').strip())
 
 
+def _git_head_state(git_repo_dir: str) -> Optional[Tuple[Any, ...]]:
+	"""
+	Returns a key that changes whenever the commit at HEAD can have changed:
+	the contents of .git/HEAD and the stat stamps of it, the branch ref it points to, and packed-refs.
+	Returns None if that can't be determined (ex: not in a repository, or .git is a file, as in worktrees).
+	"""
+	path = os.path.realpath(git_repo_dir)
+	while not os.path.isdir(os.path.join(path, '.git')):
+		parent = os.path.dirname(path)
+		if parent == path: return None
+		path = parent
+	git_dir = os.path.join(path, '.git')
+	try:
+		with open(os.path.join(git_dir, 'HEAD')) as f:
+			head = f.read().strip()
+		files = ['HEAD', 'packed-refs']
+		if head.startswith('ref: '): files.append(head[5:])
+		stamps = tuple(_file_stamp(os.path.join(git_dir, name)) for name in files)
+	except OSError:
+		return None
+	return git_dir, head, stamps
+
+def _file_stamp(path: str) -> Optional[Tuple[int, int, int]]:
+	# git replaces refs by renaming a lockfile over them, so the inode changes even if two commits land in one mtime tick
+	if not os.path.exists(path): return None
+	st = os.stat(path)
+	return st.st_mtime_ns, st.st_ino, st.st_size
+
+@functools.lru_cache(maxsize=32)
+def _commit_hash_at(state: Tuple[Any, ...], git_repo_dir: str) -> str:
+	return GitTools.description(git_repo_dir).hash
+
+
 __all__ = ['GitDescription', 'GitTools']
@@ -1,5 +1,6 @@
 import shutil
 import os
+import subprocess
 import time
 import stat
 from enum import Enum
@@ -16,6 +17,12 @@ class Deletion(Enum):
 	HARD = 3
 
 
+# the prompt lists choices from least to most destructive
+_deletion_choices = {d.name.lower(): d for d in (Deletion.NO, Deletion.TRASH, Deletion.HARD)}
+_deletion_prompt = "Delete? [{}]".format('/'.join(_deletion_choices))
+_deletion_reprompt = "Enter {}".format(' or '.join(_deletion_choices))
+
+
 def prompt_yes_no(msg: str) -> bool:
 	while True:
 		print(Fore.BLUE + msg + ' ', end='')
@@ -28,6 +35,21 @@ def prompt_yes_no(msg: str) -> bool:
 			print(Fore.BLUE + "Enter 'yes' or 'no'.")
 
 			
+def _native_rmtree(path: str) -> bool:
+	"""
+	Deletes a directory tree with rm, which is much faster than shutil.rmtree for large trees.
+	Only used on POSIX: on Windows, rd would have to go through cmd.exe, which doesn't escape metacharacters like & in the path.
+	:return: Whether it succeeded; if False, the caller should fall back to shutil.rmtree
+	"""
+	if os.name != 'posix':
+		return False
+	try:
+		subprocess.run(['rm', '-rf', '--', path], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+		return True
+	except (OSError, subprocess.CalledProcessError):
+		return False
+
+
 def deletion_fn(path) -> Optional[Exception]:
 	"""
 	Deletes files or directories, which should work even in Windows.
@@ -42,32 +64,34 @@ def deletion_fn(path) -> Optional[Exception]:
 	# another reason for returning exception:
 	# We don't want to interrupt the current line being printed like in slow_delete
 	if os.path.isdir(path):
-		shutil.rmtree(path, ignore_errors=True) # ignore_errors because of Windows
+		if not _native_rmtree(path):
+			shutil.rmtree(path, ignore_errors=True) # ignore_errors because of Windows
 		try:
 			os.remove(path)  # again, because of Windows
 		except IOError: pass  # almost definitely because it doesn't exist
 	else:
 		os.remove(path)
-	logger.debug("Permanently deleted {}".format(path))
+	logger.debug("Permanently deleted %s", path)
 	return chmod_err
 
 	
 def slow_delete(path: str, wait: int = 5, delete_fn: Callable[[str], None] = deletion_fn):
-	logger.debug("Deleting directory tree {} ...".format(path))
-	print(Fore.BLUE + "Waiting for {}s before deleting {}: ".format(wait, path), end='')
+	logger.debug("Deleting directory tree %s ...", path)
+	# flush each step so the countdown is visible on a line-buffered terminal
+	print(Fore.BLUE + "Waiting for {}s before deleting {}: ".format(wait, path), end='', flush=True)
 	for i in range(0, wait):
 		time.sleep(1)
-		print(Fore.BLUE + str(wait-i) + ' ', end='')
+		print(Fore.BLUE + str(wait-i) + ' ', end='', flush=True)
 	time.sleep(1)
-	print(Fore.BLUE + '...', end='')
+	print(Fore.BLUE + '...', end='', flush=True)
 	chmod_err = delete_fn(path)
 	print(Fore.BLUE + ' deleted.')
 	#if chmod_err is not None:
 	#	try:
 	#		raise chmod_err
 	#	except:
-	#		logger.warning("Couldn't chmod {}".format(path), exc_info=True)
-	logger.debug("Deleted directory tree {}".format(path))
+	#		logger.warning("Couldn't chmod %s", path, exc_info=True)
+	logger.debug("Deleted directory tree %s", path)
 
 
 def prompt_and_delete(
@@ -94,40 +118,40 @@ def prompt_and_delete(
 	if not allow_dirs and os.path.isdir(path):
 		raise RefusingRequestException('Cannot delete directory {}; only files are allowed'.format(path))
 
-	choices = [Deletion.NO.name.lower(), Deletion.TRASH.name.lower(), Deletion.HARD.name.lower()]
+	def poll(command: str) -> Optional[Deletion]:
 
-	def poll(command: str) -> Deletion:
+		choice = _deletion_choices.get(command.lower())
+		if choice is None and len(command) == 0 and allow_ignore:
+			choice = Deletion.NO
 
-		if command.lower() == Deletion.HARD.name.lower():
+		if choice is Deletion.HARD:
 			if show_confirmation: print(Style.BRIGHT + "Permanently deleted {}".format(path))
 			if dry:
-				logger.debug("Operating in dry mode. Would otherwise have deleted {}".format(path))
+				logger.debug("Operating in dry mode. Would otherwise have deleted %s", path)
 			else:
 				delete_fn(path)
-				logger.debug("Permanently deleted {}".format(path))
-			return Deletion.HARD
+				logger.debug("Permanently deleted %s", path)
 
-		elif command.lower() == Deletion.TRASH.name.lower():
+		elif choice is Deletion.TRASH:
 			if dry:
-				logger.debug("Operating in dry mode. Would otherwise have trashed {} to {}".format(path, trash_dir))
+				logger.debug("Operating in dry mode. Would otherwise have trashed %s to %s", path, trash_dir)
 			else:
 				shutil.move(path, trash_dir)
-				logger.debug("Trashed {} to {}".format(path, trash_dir))
+				logger.debug("Trashed %s to %s", path, trash_dir)
 			if show_confirmation: print(Style.BRIGHT + "Trashed {} to {}".format(path, trash_dir))
-			return Deletion.TRASH
 
-		elif command.lower() == Deletion.NO.name.lower() or len(command) == 0 and allow_ignore:
-			logger.debug("Will not delete {}".format(path))
-			return Deletion.NO
+		elif choice is Deletion.NO:
+			logger.debug("Will not delete %s", path)
 
 		else:
-			print(Fore.RED + "Enter {}".format(' or '.join(choices)))
-			return None
+			print(Fore.RED + _deletion_reprompt)
+
+		return choice
 
 	while True:
-		print(Fore.BLUE + "Delete? [{}]".format('/'.join(choices)), end='')
+		print(Fore.BLUE + _deletion_prompt, end='')
 		command = input('').strip()
-		#logger.debug("Received user input {}".format(command))
+		#logger.debug("Received user input %s", command)
 		polled = poll(command)
 		if polled is not None: return polled
 
@@ -1,4 +1,5 @@
 import typing, re
+from itertools import chain
 from typing import Iterator, Sequence, Type
 
 from klgists.common import abcd
@@ -21,10 +22,7 @@ class _WB(abcd.ABC):
 		self.n_rows = n_rows
 		self.n_columns = n_columns
 		self.n_wells = n_rows * n_columns
-		self.__well_name0 = self._ind_to_label
-		self.__well_index0 = self._label_to_ind
-		self.__well_rc0 = lambda i: (i//n_columns, i % n_columns)
-		self.__rc_to_i0 = lambda r, c:  self.n_columns*r + c
+		self._row_chars = tuple(chr(i) for i in range(0x41, 0x41 + n_rows))
 
 	@classmethod
 	#@abcd.abstractmethod
@@ -32,35 +30,37 @@ class _WB(abcd.ABC):
 		raise NotImplementedError()
 
 	def label_to_index(self, label: str) -> int:
-		return self.__well_index0(label) + self.base
+		return self._label_to_ind(label) + self.base
 
 	def label_to_rc(self, label: str) -> typing.Tuple[int, int]:
-		r, c = self.__well_rc0(self.__well_index0(label))
+		r, c = divmod(self._label_to_ind(label), self.n_columns)
 		return r + self.base, c + self.base
 
 	def index_to_label(self, i: int) -> str:
 		self.__check_index_range(i)
-		return self.__well_name0(i - self.base)
+		return self._ind_to_label(i - self.base)
 
 	def index_to_rc(self, i: int) -> typing.Tuple[int, int]:
 		self.__check_index_range(i)
-		r, c = self.__well_rc0(i-self.base)
+		r, c = divmod(i - self.base, self.n_columns)
 		return r+self.base, c+self.base
 
 	def rc_to_label(self, row: int, column: int) -> str:
 		self.__check_rc_range(row, column)
-		i = self.__rc_to_i0(row-self.base, column-self.base)
-		return self.__well_name0(i)
+		return self._ind_to_label(self.n_columns*(row-self.base) + column-self.base)
 
 	def rc_to_index(self, row: int, column: int) -> int:
 		self.__check_rc_range(row, column)
-		return self.__rc_to_i0(row-self.base, column-self.base) + self.base
+		return self.n_columns*(row-self.base) + column
 
 	def all_labels(self) -> Sequence[str]:
-		return [self.index_to_label(i) for i in self.all_indices()]
+		self.__check_n_rows()
+		columns = ['%02d' % (c + 1,) for c in range(self.n_columns)]
+		return [r + c for r in self._row_chars for c in columns]
 
 	def all_rcs(self) -> Sequence[typing.Tuple[int, int]]:
-		return [self.index_to_rc(i) for i in self.all_indices()]
+		columns = range(self.base, self.n_columns + self.base)
+		return [(r, c) for r in range(self.base, self.n_rows + self.base) for c in columns]
 
 	def all_indices(self) -> Sequence[int]:
 		return list(range(self.base, self.n_rows*self.n_columns+self.base))
@@ -98,6 +98,10 @@ class _WB(abcd.ABC):
 		if i < self.base or i > self.n_wells + self.base - self.base:
 			raise OutOfRangeError("{}-based index {} out of range".format(self.base, i))
 
+	def __check_n_rows(self):
+		if self.n_rows > 52:  # a 1536-well plate has 32 rows and 48 columns, so this won't work with that
+			raise OutOfRangeError('Well names are limited to plates with 26 rows!')
+
 	def __lt__(self, other):
 		if self.__class__ != other.__class__:
 			raise TypeError("Wrong type {}".format(type(other)))
@@ -116,11 +120,10 @@ class _WB(abcd.ABC):
 		Modified from https://stackoverflow.com/questions/19170420/converting-well-number-to-the-identifier-on-a-96-well-plate.
 		"""
 		index = int(index)
-		if self.n_rows > 52:  # a 1536-well plate has 32 rows and 48 columns, so this won't work with that
-			raise OutOfRangeError('Well names are limited to plates with 26 rows!')
+		self.__check_n_rows()
 		if index >= self.n_rows * self.n_columns:
 			raise OutOfRangeError('Well index {} is out of range (max is {})'.format(index, self.n_rows * self.n_columns))
-		return [chr(i) for i in range(0x41, 0x41 + self.n_rows)][index // self.n_columns] + '%02d' % (index % self.n_columns + 1,)
+		return self._row_chars[index // self.n_columns] + '%02d' % (index % self.n_columns + 1,)
 
 	def _label_to_ind(self, name: str) -> int:
 		return (ord(name[0]) % 32) * self.n_columns - 1 - (self.n_columns - int(name[1:]))
@@ -143,6 +146,13 @@ class ParsingWB(_WB, abcd.ABC):
 	"""
 
 	_pattern = re.compile(r''' *([A-H][0-9]{1,2}) *(?:(\-|–|\*|(?:\.\.\.)|…) *([A-H][0-9]{1,2}))? *''')
+	_fullmatch = _pattern.fullmatch
+	# method names, so that subclasses overriding the range methods are still used
+	_ranges = {
+		'-': 'simple_range', '–': 'simple_range',
+		'*': 'block_range',
+		'...': 'traversal_range', '…': 'traversal_range'
+	}
 
 	def parse(self, expression: str) -> Sequence[str]:
 		"""
@@ -153,26 +163,16 @@ class ParsingWB(_WB, abcd.ABC):
 			A01*C01   (a rectangular block)
 			A01...C01 (a traversal of the wells in order)
 		"""
-		trav = []
-		for txt in expression.split(','):
-			trav.extend(self._parse(txt))
-		return trav
+		return list(chain.from_iterable(map(self._parse, expression.split(','))))
 
 	def _parse(self, expression: str):
-		match = ParsingWB._pattern.fullmatch(expression)
+		match = ParsingWB._fullmatch(expression)
 		if match is None:
 			raise ValueError("{} is wrong".format(expression))
-		a, x, b = match.group(1), match.group(2), match.group(3)
+		a, x, b = match.groups()
 		if x is None:
 			return self.simple_range(a, a)
-		elif x in {'-', '–'}:
-			return self.simple_range(a, b)
-		elif x == '*':
-			return self.block_range(a, b)
-		elif x in {'...', '…'}:
-			return self.traversal_range(a, b)
-		else:
-			assert False, "WHAT?"
+		return getattr(self, ParsingWB._ranges[x])(a, b)
 
 
 class WB1(_WB):
@@ -0,0 +1,74 @@
+import pytest
+import os, json
+
+from klgists.bioinf.atc_tree import AtcParser
+
+
+def _page(*lines):
+	item = {'Data': [{'TOCHeading': 'ATC Code', 'Value': {'String': ['<br>'.join(lines)]}}]}
+	return json.dumps({'Annotations': {'TotalPages': 1, 'Annotation': [item]}}).encode('utf8')
+
+
+class _Response:
+	def __init__(self, status_code, body=b'', headers=None, fail_after=None):
+		self.status_code, self.body, self.headers, self.fail_after = status_code, body, headers or {}, fail_after
+	def __enter__(self): return self
+	def __exit__(self, *args): pass
+	def raise_for_status(self): pass
+	def iter_content(self, chunk_size):
+		for i in range(0, len(self.body), 4):
+			if self.fail_after is not None and i >= self.fail_after:
+				raise ConnectionError("dropped")
+			yield self.body[i : i + 4]
+
+
+class _Session:
+	def __init__(self, *responses):
+		self.responses, self.sent = list(responses), []
+	def get(self, url, headers, stream):
+		self.sent.append(headers)
+		return self.responses.pop(0)
+
+
+class TestAtcParser:
+
+	def test_fetch_page(self, tmpdir, monkeypatch):
+		monkeypatch.chdir(str(tmpdir))
+		parser = AtcParser()
+		old, new = _page('<b>A</b> - OLD'), _page('<b>A</b> - NEW')
+		parser._session = _Session(
+			_Response(200, old, {'ETag': '"1"'}),
+			_Response(304),
+			_Response(200, new, {'ETag': '"2"'}, fail_after=8),
+			_Response(200, new, {'ETag': '"2"'})
+		)
+		p = parser._fetch_page(1)
+		parser._fetch_page(1)
+		assert parser._session.sent[1] == {'If-None-Match': '"1"'}
+		with pytest.raises(ConnectionError):
+			parser._fetch_page(1, force=True)
+		# the interrupted download leaves the old page and its validators intact
+		with open(p, 'rb') as f: assert f.read() == old
+		assert sorted(os.listdir('.atc')) == ['page-1.txt', 'page-1.txt.etag', 'page-1.txt.modified']
+		parser._fetch_page(1, force=True)
+		assert parser._session.sent[2] == parser._session.sent[3] == {}
+		with open(p, 'rb') as f: assert f.read() == new
+		with open(p + '.etag') as f: assert f.read() == '"2"'
+
+
+class TestAtcTree:
+
+	def test_get(self, tmpdir, monkeypatch):
+		monkeypatch.chdir(str(tmpdir))
+		parser = AtcParser()
+		parser._session = _Session(_Response(200, _page('A - ALIMENTARY', 'A01 - STOMATOLOGICAL')))
+		tree = parser.load()
+		assert len(tree) == 3
+		assert tree.get('A01').desc == 'STOMATOLOGICAL' and tree['A01'].parent is tree.get('A')
+		assert 'A' in tree and 'B' not in tree
+		with pytest.raises(KeyError):
+			tree.get('B')
+		assert sorted(a.code for a in tree.nodes()) == ['/', 'A', 'A01']
+		# the pickled tree loads the same
+		again = AtcParser().load()
+		assert again.get('A01').desc == 'STOMATOLOGICAL' and again['A01'].parent is again['A']
@@ -0,0 +1,63 @@
+import pytest
+
+from klgists.common import abcd
+
+
+@abcd.auto_eq(only=['a', 'b'])
+@abcd.auto_hash(only=['a', 'b'])
+class _Pair:
+	def __init__(self, **kwargs):
+		self.__dict__.update(kwargs)
+
+
+class TestAbcd:
+
+	def test_auto_eq_hash_only(self):
+		assert _Pair(a=1, b=2) == _Pair(a=1, b=2, c=3)
+		assert _Pair(a=1, b=2) != _Pair(a=1, b=3)
+		assert hash(_Pair(a=1, b=2)) == hash(_Pair(a=1, b=2, c=3))
+		# attributes that were never set don't raise
+		assert _Pair(a=1) == _Pair(a=1, b=None)
+		assert _Pair(a=1) != _Pair(a=1, b=2)
+		assert hash(_Pair()) == hash(_Pair(a=None))
+		with pytest.raises(TypeError):
+			_Pair(a=1) == 1
+
+	def test_auto_eq_only_matches_default(self):
+		@abcd.auto_eq()
+		@abcd.auto_hash()
+		class All:
+			def __init__(self, a, b): self.a, self.b = a, b
+		# `only` narrows the attributes but otherwise compares the same way, so Nones are skipped in both
+		for cls in [All, _Pair]:
+			x, y = cls(a=1, b=None), cls(a=None, b=1)
+			assert x == y and hash(x) == hash(y)
+
+	def test_type_decorators(self):
+		@abcd.float_type('x')
+		@abcd.int_type('x')
+		class Number:
+			def __init__(self, x): self.x = x
+		@abcd.sequence_over('items')
+		class Seq:
+			def __init__(self, items): self.items = items
+		@abcd.collection_over('items')
+		class Coll:
+			def __init__(self, items): self.items = items
+		@abcd.iterable_over('items')
+		class Iter:
+			def __init__(self, items): self.items = items
+		assert float(Number(2.5)) == 2.5 and int(Number(2.5)) == 2
+		assert len(Seq([1, 2, 3])) == 3 and Seq([1, 2, 3])[1] == 2 and list(Seq([1, 2])) == [1, 2]
+		assert len(Coll({4, 5})) == 2 and sorted(Coll({4, 5})) == [4, 5]
+		assert list(Iter((6, 7))) == [6, 7]
+
+	def test_auto_singleton(self):
+		@abcd.auto_singleton
+		class A:
+			def __init__(self): self.n = getattr(self, 'n', 0) + 1
+		class B(A): pass
+		a, b = A(), B()
+		assert a is A() and b is B() and a is not b
+		assert type(a) is A and type(b) is B and isinstance(b, A)
+		assert a.n == 1 and b.n == 1
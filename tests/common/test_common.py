@@ -41,6 +41,84 @@ class TestCommon:
 				list(z([1, 2], [3]))
 			with pytest.raises(LengthMismatchError):
 				list(z([1], []))
+			assert list(z([1, 2])) == [(1,), (2,)]
+			assert list(z(iter([1, 2]), iter([3, 4]), iter([5, 6]))) == [(1, 3, 5), (2, 4, 6)]
+			with pytest.raises(LengthMismatchError):
+				list(z([1, 2], [3, 4], [5]))
+			with pytest.raises(LengthMismatchError):
+				list(z(iter([1]), iter([2, 3]), iter([4, 5])))
+
+	def test_frozenlist_hash(self):
+		a, b = frozenlist(1, 2), frozenlist(1, 2)
+		assert a == b and hash(a) == hash(b) == hash((1, 2))
+		assert a != frozenlist(2, 1)
+		assert a != (1, 2)
+		assert {a: 'x'}[b] == 'x'
+		assert len({a, b, frozenlist(3)}) == 2
+
+	def test_frozenlist_getitem(self):
+		x = frozenlist(1, 2, 3)
+		assert x[0] == 1 and x[-1] == 3
+		assert isinstance(x[1:], frozenlist)
+		assert x[1:] == frozenlist(2, 3)
+		assert list(x[::-1]) == [3, 2, 1]
+		with pytest.raises(IndexError):
+			x[3]
+
+	def test_frozenlist_pickle(self):
+		import pickle
+		x = frozenlist(1, 'a', (2, 3))
+		hash(x)
+		x._frozenlist__hash = -1  # as if hashed under another PYTHONHASHSEED
+		y = pickle.loads(pickle.dumps(x))
+		assert isinstance(y, frozenlist) and list(y) == [1, 'a', (2, 3)]
+		assert y == frozenlist(1, 'a', (2, 3))
+		assert hash(y) == hash((1, 'a', (2, 3)))
+		assert pickle.loads(pickle.dumps(frozenlist())) == frozenlist()
+		import weakref
+		assert weakref.ref(x)() is x
+
+	def test_exception_pickle(self):
+		import pickle, copy
+		from klgists.common.exceptions import ExternalCommandFailed, RoiError, Edge, Axis
+		e = RoiError('bad roi').on_edge(Edge.LEFT).on_axis(Axis.VERTICAL)
+		for f in [copy.copy, lambda x: pickle.loads(pickle.dumps(x))]:
+			r = f(e)
+			assert (r.args[0], r.edge, r.axis) == ('bad roi', Edge.LEFT, Axis.VERTICAL)
+		e = ExternalCommandFailed('failed', 'ls', 2, 'out', 'err')
+		r = pickle.loads(pickle.dumps(e))
+		assert (str(r), r.command, r.exit_code, r.stdout, r.stderr) == ('failed', 'ls', 2, 'out', 'err')
+
+	def test_exception_weakref(self):
+		import weakref
+		from klgists.common.exceptions import ImpossibleStateException, RoiOutOfBoundsError
+		for e in [LookupFailedException('x'), ImpossibleStateException('y'), RoiOutOfBoundsError('z')]:
+			assert weakref.ref(e)() is e
+
+	def test_log_writer(self, caplog):
+		import logging
+		caplog.set_level(logging.DEBUG, logger='klgists')
+		LogWriter('warning').write('by name')
+		LogWriter(logging.ERROR).write('by number')
+		assert [(r.levelname, r.getMessage()) for r in caplog.records] == [('WARNING', 'by name'), ('ERROR', 'by number')]
+		assert LogWriter('debug').level == 'DEBUG'
+		with pytest.raises(LookupFailedException):
+			LogWriter('loud')
+
+	def test_delegating_writer(self):
+		import io
+		a, b = io.StringIO(), io.StringIO()
+		with DelegatingWriter(a, DevNull(), b) as w:
+			w.write('x')
+			w.flush()
+			assert a.getvalue() == b.getvalue() == 'x'
+		assert a.closed and b.closed
+
+	def test_writer_weakref(self):
+		import weakref, io
+		from klgists.common import tools
+		for w in [DevNull(), tools.DevNull(), LogWriter('info'), DelegatingWriter(DevNull()), Capture(io.StringIO())]:
+			assert weakref.ref(w)() is w
 
 	def test_read_lines(self):
 		assert (
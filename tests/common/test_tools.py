@@ -147,6 +147,72 @@ class TestGists:
 		data = Tools.read_properties_file(path)
 		assert data == {'abc': 'xyz', '123': '1533'}
 
+	def test_save_json_non_finite(self, tmpdir):
+		path = str(tmpdir.join('x.json'))
+		Tools.save_json({'a': [1.5, float('nan'), float('inf'), -float('inf')], 'b': None, 'c': np.array([1, 2])}, path)
+		data = Tools.load_json(path)
+		assert data['a'][0] == 1.5 and np.isnan(data['a'][1]) and data['a'][2:] == [float('inf'), -float('inf')]
+		assert data['b'] is None and data['c'] == [1, 2]
+		Tools.save_json({'x': [1, 'null']}, path)
+		assert Tools.load_json(path) == {'x': [1, 'null']}
+
+	def test_save_json_format(self, tmpdir, monkeypatch):
+		from klgists.common.tools import sys_tools
+		data = {'a': [1, 2.5, None], 'b': 'é'}
+		texts = []
+		for orjson in [sys_tools.orjson, None]:
+			monkeypatch.setattr(sys_tools, 'orjson', orjson)
+			path = str(tmpdir.join('{}.json'.format(len(texts))))
+			Tools.save_json(data, path)
+			with open(path, encoding='utf8') as f: texts.append(f.read())
+		assert texts[0] == texts[1] == '{"a":[1,2.5,null],"b":"é"}'
+
+	def test_imin_imax(self):
+		assert Tools.imin(3, 1, 2) == 1 and Tools.imax(3, 1, 2) == 3
+		assert Tools.imin([3.5, 1.2]) == 1 and Tools.imax((3.5, 1.2)) == 3
+		arr = np.array([[3, 9], [0, 4]])
+		assert Tools.imin(arr) == 0 and Tools.imax(arr) == 9
+		assert type(Tools.imin(arr)) is int
+		assert Tools.imin([1, 2], [0, 5]) == 0 and Tools.imax(np.array([1, 2]), np.array([0, 5])) == 5
+
+	def test_slice_bounded(self):
+		arr = np.arange(5)
+		assert list(Tools.slice_bounded(arr, 1, 3)) == [1, 2]
+		assert list(Tools.slice_bounded(arr, -2, None)) == [3, 4]
+		assert list(Tools.slice_bounded(arr, None, -1)) == [0, 1, 2, 3]
+		assert list(Tools.slice_bounded(arr, -10, 10)) == [0, 1, 2, 3, 4]
+		assert list(Tools.slice_bounded(arr, None, -10)) == []
+
+	def test_ms_to_minsec(self):
+		assert Tools.ms_to_minsec(999) == '999ms'
+		assert Tools.ms_to_minsec(61000) == '01:01'
+		assert Tools.ms_to_minsec(3599999) == '59:59'
+		assert Tools.ms_to_minsec(3600000) == '01:00:00'
+		assert Tools.ms_to_minsec(86400000) == '1d:00:00:00'
+		assert Tools.ms_to_minsec(90061000) == '1d:01:01:01'
+		assert Tools.ms_to_minsec(-61000) == '−01:01'
+
+	def test_dose_to_micromolar(self):
+		assert Tools.dose_to_micromolar(53, 'nM') == 0.053
+		assert Tools.dose_to_micromolar(5, 'pM') == 5e-06
+		assert Tools.dose_to_micromolar(5, 'fM') == 5e-09
+		assert Tools.dose_to_micromolar(2, 'mM') == 2000
+		assert Tools.dose_to_micromolar(2, 'M') == 2000000
+		assert Tools.dose_to_micromolar(7, 'µM') == Tools.dose_to_micromolar(7, 'uM') == 7
+		with pytest.raises(KeyError):
+			Tools.dose_to_micromolar(1, 'kM')
+
+	def test_write_lines(self, tmpdir):
+		path = str(tmpdir.join('lines.txt'))
+		assert Tools.write_lines(range(2500), path) == 2500
+		with open(path) as f:
+			assert f.read() == ''.join(str(i) + '\n' for i in range(2500))
+		empty = str(tmpdir.join('empty.txt'))
+		assert Tools.write_lines(iter([]), empty) == 0
+		assert os.path.getsize(empty) == 0
+		with pytest.raises(ValueError):
+			Tools.write_lines('abc', str(tmpdir.join('str.txt')))
+
 
 if __name__ == '__main__':
 	pytest.main()
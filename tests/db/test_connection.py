@@ -0,0 +1,168 @@
+import pytest
+import threading
+
+from klgists.db.connection import _ConnectionPool, _WriteBuffer, _SharedTunnels
+
+
+class _FakeConnection:
+	def __init__(self, fail_rollback=False):
+		self.fail_rollback, self.n_rollbacks, self.n_pings, self.closed = fail_rollback, 0, 0, False
+	def ping(self, reconnect): self.n_pings += 1
+	def rollback(self):
+		if self.fail_rollback:
+			raise OSError("gone")
+		self.n_rollbacks += 1
+	def close(self): self.closed = True
+
+
+class _FakeTunnel:
+	def __init__(self, started=None, proceed=None):
+		self.started, self.proceed, self.is_active, self.closed = started, proceed, False, False
+	def start(self):
+		if self.started is not None:
+			self.started.set()
+			self.proceed.wait(5)
+		self.is_active = True
+	def close(self):
+		self.is_active, self.closed = False, True
+
+
+class TestConnectionPool:
+
+	def test_borrow_rolls_back_on_error(self):
+		pool = _ConnectionPool(_FakeConnection, 1, 1)
+		with pytest.raises(ValueError):
+			with pool.borrow() as conn:
+				raise ValueError()
+		assert conn.n_rollbacks == 1
+		with pool.borrow() as again:
+			assert again is conn
+		assert conn.n_rollbacks == 1
+
+	def test_borrow_replaces_broken_connection(self):
+		made = []
+		pool = _ConnectionPool(lambda: made.append(_FakeConnection(fail_rollback=len(made) == 0)) or made[-1], 1, 1)
+		with pytest.raises(ValueError):
+			with pool.borrow():
+				raise ValueError()
+		assert made[0].closed
+		with pool.borrow() as conn:
+			assert conn is made[1]
+
+	def test_failed_connects_free_their_slots(self):
+		def factory():
+			raise ConnectionError("refused")
+		pool = _ConnectionPool(factory, 0, 2)
+		for _ in range(5):
+			with pytest.raises(ConnectionError):
+				with pool.borrow(): pass
+
+	def test_discarding_wakes_a_waiter(self):
+		made = []
+		pool = _ConnectionPool(lambda: made.append(_FakeConnection(fail_rollback=len(made) == 0)) or made[-1], 1, 1)
+		borrowed = []
+		def borrow():
+			with pool.borrow() as conn:
+				borrowed.append(conn)
+		with pytest.raises(ValueError):
+			with pool.borrow():
+				waiter = threading.Thread(target=borrow, daemon=True)
+				waiter.start()
+				raise ValueError()
+		waiter.join(5)
+		assert borrowed == [made[1]]
+
+	def test_ping_only_after_idle(self):
+		pool = _ConnectionPool(_FakeConnection, 1, 1, ping_after_seconds=60)
+		with pool.borrow() as conn: pass
+		with pool.borrow(): pass
+		assert conn.n_pings == 0
+		pool = _ConnectionPool(_FakeConnection, 1, 1, ping_after_seconds=-1)
+		with pool.borrow() as conn: pass
+		with pool.borrow(): pass
+		assert conn.n_pings == 2
+
+
+class TestWriteBuffer:
+
+	def test_failed_flush_keeps_rows(self):
+		written, fail = [], ['b']
+		def write(statement, rows):
+			if statement in fail:
+				raise ConnectionError(statement)
+			written.append((statement, rows))
+		buffer = _WriteBuffer(write, 100, None)
+		for statement, row in [('a', 1), ('b', 2), ('c', 3), ('b', 4)]:
+			buffer.add(statement, (row,))
+		with pytest.raises(ConnectionError):
+			buffer.flush()
+		assert written == [('a', [(1,)])]
+		fail.clear()
+		buffer.flush()
+		assert written == [('a', [(1,)]), ('b', [(2,), (4,)]), ('c', [(3,)])]
+
+	def test_timed_flush_error_is_raised_later(self):
+		import time
+		def write(statement, rows):
+			raise ConnectionError(statement)
+		buffer = _WriteBuffer(write, 100, 0.01)
+		buffer.add('a', (1,))
+		deadline = time.monotonic() + 5
+		while buffer._error is None and time.monotonic() < deadline:
+			time.sleep(0.01)
+		with pytest.raises(ConnectionError):
+			buffer.add('a', (2,))
+		with pytest.raises(ConnectionError):
+			buffer.flush()
+		assert buffer._rows == {'a': [(1,)]}
+
+
+class TestSharedTunnels:
+
+	def test_closes_without_linger(self):
+		tunnels = _SharedTunnels()
+		a = tunnels.acquire(('h', 22), _FakeTunnel)
+		assert tunnels.acquire(('h', 22), _FakeTunnel) is a
+		tunnels.release(('h', 22), 0)
+		assert not a.closed
+		tunnels.release(('h', 22), 0)
+		assert a.closed
+		assert tunnels.acquire(('h', 22), _FakeTunnel) is not a
+
+	def test_lingers_until_reacquired(self):
+		tunnels = _SharedTunnels()
+		a = tunnels.acquire(('h', 22), _FakeTunnel)
+		tunnels.release(('h', 22), 60)
+		assert tunnels.acquire(('h', 22), _FakeTunnel) is a
+		assert not a.closed
+
+	def test_starts_outside_the_lock(self):
+		tunnels = _SharedTunnels()
+		started, proceed = threading.Event(), threading.Event()
+		slow = threading.Thread(target=tunnels.acquire, args=(('slow', 22), lambda: _FakeTunnel(started, proceed)))
+		slow.start()
+		assert started.wait(5)
+		try:
+			# a different host doesn't wait for the slow handshake
+			assert tunnels.acquire(('fast', 22), _FakeTunnel).is_active
+		finally:
+			proceed.set()
+			slow.join(5)
+
+	def test_concurrent_start_keeps_one_tunnel(self):
+		tunnels = _SharedTunnels()
+		started, proceed = threading.Event(), threading.Event()
+		slow = _FakeTunnel(started, proceed)
+		results = []
+		thread = threading.Thread(target=lambda: results.append(tunnels.acquire(('h', 22), lambda: slow)))
+		thread.start()
+		assert started.wait(5)
+		fast = tunnels.acquire(('h', 22), _FakeTunnel)
+		proceed.set()
+		thread.join(5)
+		assert results == [fast]
+		assert slow.closed and not fast.closed
+		tunnels.release(('h', 22), 0)
+		assert not fast.closed
+		tunnels.release(('h', 22), 0)
+		assert fast.closed
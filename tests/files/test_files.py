@@ -0,0 +1,38 @@
+import pytest
+import os, stat
+from pathlib import Path
+
+from klgists.files import replace_in_file
+
+
+class TestFiles:
+
+	def test_replace_in_file_regex(self, tmpdir):
+		path = Path(str(tmpdir.join('x.sh')))
+		path.write_text('#!/bin/sh\necho a1\necho a2\n' + 'z\n' * 10, encoding='utf8')
+		os.chmod(str(path), 0o755)
+		(tmpdir / 'x.sh.tmp').write('keep')
+		replace_in_file(path, {r'^echo a(\d)$': r'echo b\1', 'z\n': ''})
+		assert path.read_text(encoding='utf8') == '#!/bin/sh\necho b1\necho b2\n'
+		assert stat.S_IMODE(os.stat(str(path)).st_mode) == 0o755
+		assert (tmpdir / 'x.sh.tmp').read() == 'keep'
+		assert sorted(os.listdir(str(tmpdir))) == ['x.sh', 'x.sh.tmp']
+
+	def test_replace_in_file_in_place(self, tmpdir):
+		path = str(tmpdir.join('x.txt'))
+		with open(path, 'w', encoding='utf8') as f: f.write('abc abc\nxyz ü\n')
+		replace_in_file(path, {'abc': 'def', 'ü': 'é', 'def def': 'ghi ghi'})
+		with open(path, encoding='utf8') as f: assert f.read() == 'ghi ghi\nxyz é\n'
+		empty = str(tmpdir.join('empty.txt'))
+		open(empty, 'w').close()
+		replace_in_file(empty, {'a': 'b'})
+		assert os.path.getsize(empty) == 0
+
+	def test_replace_in_file_newlines(self, tmpdir):
+		# the same call gives the same newlines whichever path it takes
+		for changes in [{'abc': 'xyz'}, {'abc': 'wxyz'}]:
+			path = str(tmpdir.join('crlf.txt'))
+			with open(path, 'wb') as f: f.write(b'abc\r\ndef\r\n')
+			replace_in_file(path, changes)
+			with open(path, 'rb') as f:
+				assert f.read() == changes['abc'].encode('utf8') + b'\ndef\n'
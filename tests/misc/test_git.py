@@ -0,0 +1,22 @@
+import pytest
+import os
+
+from klgists.misc.git import _git_head_state
+
+
+class TestGit:
+
+	def test_head_state_sees_replaced_ref(self, tmpdir):
+		git_dir = tmpdir.mkdir('.git')
+		git_dir.join('HEAD').write('ref: refs/heads/master\n')
+		ref = git_dir.mkdir('refs').mkdir('heads').join('master')
+		ref.write('a' * 40 + '\n')
+		before = _git_head_state(str(tmpdir))
+		# a second commit in the same mtime tick, written the way git does it
+		mtime = os.stat(str(ref)).st_mtime_ns
+		lock = git_dir.join('refs', 'heads', 'master.lock')
+		lock.write('b' * 40 + '\n')
+		os.replace(str(lock), str(ref))
+		os.utime(str(ref), ns=(mtime, mtime))
+		assert _git_head_state(str(tmpdir)) != before
+		assert _git_head_state(str(tmpdir)) == _git_head_state(str(tmpdir))
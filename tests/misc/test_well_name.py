@@ -51,4 +51,14 @@ class TestWellBase:
 		assert wb.parse("A01-A04") == ['A01', 'A02', 'A03', 'A04']
 		assert wb.parse("A01...B02") == ['A01', 'A02', 'A03', 'A04', 'B01', 'B02']
 		assert wb.parse("A01*B02") == ['A01', 'A02', 'B01', 'B02']
+		assert wb.parse("A01-A02,B01...B02") == ['A01', 'A02', 'B01', 'B02']
+		with pytest.raises(ValueError):
+			wb.parse("A01-A02,Z01")
+
+	def test_parse_uses_overrides(self):
+		class ReversedWB(ParsingWB1):
+			def block_range(self, a: str, b: str):
+				return reversed(list(super().block_range(a, b)))
+		wb = ReversedWB(4, 4)
+		assert wb.parse("A01*B02") == ['B02', 'B01', 'A02', 'A01']
 